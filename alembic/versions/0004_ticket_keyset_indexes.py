@@ -0,0 +1,31 @@
+from alembic import op
+
+
+revision = "0004_ticket_keyset_indexes"
+down_revision = "0003_ticket_uniques_times"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_tickets_created_at_id", "tickets", ["created_at", "id"], unique=False)
+    op.create_index("ix_tickets_status_created_at_id", "tickets", ["status", "created_at", "id"], unique=False)
+    op.create_index("ix_tickets_worker_created_at_id", "tickets", ["worker_id", "created_at", "id"], unique=False)
+    op.create_index(
+        "ix_tickets_worker_status_created_at_id",
+        "tickets",
+        ["worker_id", "status", "created_at", "id"],
+        unique=False,
+    )
+    # covered by the leading columns of the composite indexes above
+    op.drop_index("ix_tickets_created_at", table_name="tickets")
+    op.drop_index("ix_tickets_status", table_name="tickets")
+
+
+def downgrade() -> None:
+    op.create_index("ix_tickets_status", "tickets", ["status"], unique=False)
+    op.create_index("ix_tickets_created_at", "tickets", ["created_at"], unique=False)
+    op.drop_index("ix_tickets_worker_status_created_at_id", table_name="tickets")
+    op.drop_index("ix_tickets_worker_created_at_id", table_name="tickets")
+    op.drop_index("ix_tickets_status_created_at_id", table_name="tickets")
+    op.drop_index("ix_tickets_created_at_id", table_name="tickets")
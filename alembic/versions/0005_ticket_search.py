@@ -0,0 +1,49 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0005_ticket_search"
+down_revision = "0004_ticket_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column(
+        "tickets",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))",
+                persisted=True,
+            ),
+        ),
+    )
+    op.create_index("ix_tickets_search_vector", "tickets", ["search_vector"], postgresql_using="gin")
+    op.create_index(
+        "ix_tickets_title_trgm",
+        "tickets",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_tickets_description_trgm",
+        "tickets",
+        ["description"],
+        postgresql_using="gin",
+        postgresql_ops={"description": "gin_trgm_ops"},
+    )
+    # btree on title cannot serve '%term%' lookups; superseded by the trigram index
+    op.drop_index("ix_tickets_title", table_name="tickets")
+
+
+def downgrade() -> None:
+    op.create_index("ix_tickets_title", "tickets", ["title"], unique=False)
+    op.drop_index("ix_tickets_description_trgm", table_name="tickets")
+    op.drop_index("ix_tickets_title_trgm", table_name="tickets")
+    op.drop_index("ix_tickets_search_vector", table_name="tickets")
+    op.drop_column("tickets", "search_vector")
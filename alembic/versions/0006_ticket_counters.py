@@ -0,0 +1,87 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0006_ticket_counters"
+down_revision = "0005_ticket_search"
+branch_labels = None
+depends_on = None
+
+
+# Counters are striped over a few shards per (worker_id, status) so concurrent writers
+# rarely wait on the same row; readers sum the shards.
+COUNTERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_counters_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    stripe smallint := floor(random() * 16);
+BEGIN
+    IF current_setting('app.skip_ticket_counters', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ticket_counters AS c (worker_id, status, shard, count)
+        SELECT coalesce(worker_id, 0), status, stripe, count(*)
+        FROM new_rows GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO ticket_counters AS c (worker_id, status, shard, count)
+        SELECT coalesce(worker_id, 0), status, stripe, -count(*)
+        FROM old_rows GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO ticket_counters AS c (worker_id, status, shard, count)
+        SELECT worker_id, status, stripe, sum(delta)
+        FROM (
+            SELECT coalesce(worker_id, 0) AS worker_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT coalesce(worker_id, 0), status, 1 FROM new_rows
+        ) changes
+        GROUP BY 1, 2 HAVING sum(delta) <> 0 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticket_counters",
+        sa.Column("worker_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM("new", "in_progress", "done", name="ticketstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("worker_id", "status", "shard", name="pk_ticket_counters"),
+    )
+    op.execute(COUNTERS_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER tickets_counters_insert AFTER INSERT ON tickets "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()"
+    )
+    op.execute(
+        "CREATE TRIGGER tickets_counters_update AFTER UPDATE ON tickets "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()"
+    )
+    op.execute(
+        "CREATE TRIGGER tickets_counters_delete AFTER DELETE ON tickets "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()"
+    )
+    op.execute(
+        "INSERT INTO ticket_counters (worker_id, status, shard, count) "
+        "SELECT coalesce(worker_id, 0), status, 0, count(*) FROM tickets GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS tickets_counters_delete ON tickets")
+    op.execute("DROP TRIGGER IF EXISTS tickets_counters_update ON tickets")
+    op.execute("DROP TRIGGER IF EXISTS tickets_counters_insert ON tickets")
+    op.execute("DROP FUNCTION IF EXISTS ticket_counters_sync()")
+    op.drop_table("ticket_counters")
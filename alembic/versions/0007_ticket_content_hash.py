@@ -0,0 +1,68 @@
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007_ticket_content_hash"
+down_revision = "0006_ticket_counters"
+branch_labels = None
+depends_on = None
+
+
+BATCH_SIZE = 5000
+
+
+def _content_hash(title: str, description: str, email: str) -> str:
+    # app.models.ticket_content_hash as of this revision; computed in Python because SQL
+    # lower() and \s follow the database locale, not Python's Unicode rules
+    raw = "\x1f".join(" ".join(part.split()).lower() for part in (title, description, email))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def upgrade() -> None:
+    op.add_column("tickets", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    bind = op.get_bind()
+    op.execute(
+        "CREATE TEMPORARY TABLE ticket_hashes (id integer PRIMARY KEY, content_hash varchar(64)) ON COMMIT DROP"
+    )
+    ticket_hashes = sa.table("ticket_hashes", sa.column("id"), sa.column("content_hash"))
+    after = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT t.id, t.title, t.description, c.email FROM tickets t JOIN clients c ON c.id = t.client_id "
+                "WHERE t.id > :after ORDER BY t.id LIMIT :limit"
+            ),
+            {"after": after, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            ticket_hashes.insert(),
+            [{"id": row.id, "content_hash": _content_hash(row.title, row.description, row.email)} for row in rows],
+        )
+        after = rows[-1].id
+    # hash-only rewrite: counts do not change, skip the counter triggers
+    op.execute("SET LOCAL app.skip_ticket_counters = on")
+    # the oldest ticket per hash (lowest id) keeps it; newer exact/near duplicates stay NULL
+    op.execute(
+        """
+        UPDATE tickets SET content_hash = hashed.content_hash
+        FROM (
+            SELECT id, content_hash, row_number() OVER (PARTITION BY content_hash ORDER BY id) AS rn
+            FROM ticket_hashes
+        ) hashed
+        WHERE tickets.id = hashed.id AND hashed.rn = 1
+        """
+    )
+    op.execute("RESET app.skip_ticket_counters")
+    op.create_index("uq_tickets_content_hash", "tickets", ["content_hash"], unique=True)
+    # superseded by the hash; its btree over full description text was unbounded in size
+    op.drop_constraint("uq_ticket_client_content", "tickets", type_="unique")
+
+
+def downgrade() -> None:
+    op.create_unique_constraint("uq_ticket_client_content", "tickets", ["title", "description", "client_id"])
+    op.drop_index("uq_tickets_content_hash", table_name="tickets")
+    op.drop_column("tickets", "content_hash")
@@ -0,0 +1,49 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_client_email_key"
+down_revision = "0007_ticket_content_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "clients",
+        sa.Column("email_key", sa.String(length=200), sa.Computed("lower(btrim(email))", persisted=True)),
+    )
+    # merge duplicate clients into the oldest row per email, carrying over the newest name/phone
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE client_merge ON COMMIT DROP AS
+        SELECT id,
+               min(id) OVER w AS keep_id,
+               first_value(name) OVER (w ORDER BY created_at DESC, id DESC) AS latest_name,
+               first_value(phone) OVER (w ORDER BY (phone IS NULL), created_at DESC, id DESC) AS latest_phone
+        FROM clients
+        WINDOW w AS (PARTITION BY email_key)
+        """
+    )
+    # only client_id changes here; ticket counts stay the same
+    op.execute("SET LOCAL app.skip_ticket_counters = on")
+    op.execute(
+        "UPDATE tickets SET client_id = m.keep_id FROM client_merge m "
+        "WHERE tickets.client_id = m.id AND m.id <> m.keep_id"
+    )
+    op.execute("RESET app.skip_ticket_counters")
+    op.execute(
+        "UPDATE clients SET name = m.latest_name, phone = m.latest_phone FROM client_merge m "
+        "WHERE clients.id = m.id AND m.id = m.keep_id"
+    )
+    op.execute("DELETE FROM clients USING client_merge m WHERE clients.id = m.id AND m.id <> m.keep_id")
+    op.create_index("uq_clients_email_key", "clients", ["email_key"], unique=True)
+    # lookups go through email_key now
+    op.drop_index("ix_clients_email", table_name="clients")
+
+
+def downgrade() -> None:
+    # merged clients are not split again
+    op.create_index("ix_clients_email", "clients", ["email"], unique=False)
+    op.drop_index("uq_clients_email_key", table_name="clients")
+    op.drop_column("clients", "email_key")
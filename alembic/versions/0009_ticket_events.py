@@ -0,0 +1,92 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0009_ticket_events"
+down_revision = "0008_client_email_key"
+branch_labels = None
+depends_on = None
+
+
+# One statement writes its events and sends a single NOTIFY "lo:hi:tx" after commit; listeners
+# read back exactly that statement's rows, so a large bulk update never overflows the payload.
+EVENTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_events_capture() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    lo bigint;
+    hi bigint;
+BEGIN
+    IF current_setting('app.skip_ticket_events', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        WITH ins AS (
+            INSERT INTO ticket_events (ticket_id, kind, status, worker_id, viewed)
+            SELECT id, 'created', status, worker_id, viewed FROM new_rows ORDER BY id
+            RETURNING id
+        )
+        SELECT min(id), max(id) INTO lo, hi FROM ins;
+    ELSE
+        WITH ins AS (
+            INSERT INTO ticket_events (ticket_id, kind, status, worker_id, viewed)
+            SELECT n.id, k.kind, n.status, n.worker_id, n.viewed
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES
+                    ('assigned', n.worker_id IS DISTINCT FROM o.worker_id),
+                    ('status', n.status IS DISTINCT FROM o.status),
+                    ('viewed', n.viewed IS DISTINCT FROM o.viewed)
+            ) AS k (kind, changed)
+            WHERE k.changed
+            ORDER BY n.id
+            RETURNING id
+        )
+        SELECT min(id), max(id) INTO lo, hi FROM ins;
+    END IF;
+    IF lo IS NOT NULL THEN
+        PERFORM pg_notify('ticket_events', lo || ':' || hi || ':' || txid_current());
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ticket_events",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM("new", "in_progress", "done", name="ticketstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("worker_id", sa.Integer(), nullable=True),
+        sa.Column("viewed", sa.Boolean(), nullable=False),
+        sa.Column("tx", sa.BigInteger(), nullable=False, server_default=sa.text("txid_current()")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    # worker feeds replay only their own tickets
+    op.create_index("ix_ticket_events_worker_id_id", "ticket_events", ["worker_id", "id"])
+    op.create_index("ix_ticket_events_created_at", "ticket_events", ["created_at"])
+    op.execute(EVENTS_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER tickets_events_insert AFTER INSERT ON tickets "
+        "REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION ticket_events_capture()"
+    )
+    op.execute(
+        "CREATE TRIGGER tickets_events_update AFTER UPDATE ON tickets "
+        "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+        "FOR EACH STATEMENT EXECUTE FUNCTION ticket_events_capture()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS tickets_events_update ON tickets")
+    op.execute("DROP TRIGGER IF EXISTS tickets_events_insert ON tickets")
+    op.execute("DROP FUNCTION IF EXISTS ticket_events_capture()")
+    op.drop_table("ticket_events")
@@ -0,0 +1,50 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010_table_versions"
+down_revision = "0009_ticket_events"
+branch_labels = None
+depends_on = None
+
+
+VERSIONED_TABLES = ("tickets", "clients", "users")
+
+# Striped like ticket_counters so concurrent writers rarely queue on one row; the version of a
+# table is the sum over its shards and only ever grows.
+VERSIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION table_versions_bump() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO table_versions AS v (table_name, shard, version, modified_at)
+    VALUES (TG_TABLE_NAME, floor(random() * 16), 1, clock_timestamp())
+    ON CONFLICT (table_name, shard)
+    DO UPDATE SET version = v.version + 1, modified_at = greatest(v.modified_at, EXCLUDED.modified_at);
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "table_versions",
+        sa.Column("table_name", sa.String(length=63), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("modified_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("table_name", "shard", name="pk_table_versions"),
+    )
+    op.execute(VERSIONS_FUNCTION)
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            "FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()"
+        )
+        op.execute(f"INSERT INTO table_versions (table_name, shard, version) VALUES ('{table}', 0, 1)")
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_version_bump ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS table_versions_bump()")
+    op.drop_table("table_versions")
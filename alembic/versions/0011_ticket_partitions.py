@@ -0,0 +1,214 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_ticket_partitions"
+down_revision = "0010_table_versions"
+branch_labels = None
+depends_on = None
+
+
+MONTHS_AHEAD = 3
+
+# statement triggers of the plain table, recreated on the partitioned parent
+TRIGGERS = {
+    "tickets_counters_insert": "AFTER INSERT ON tickets REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()",
+    "tickets_counters_update": "AFTER UPDATE ON tickets REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()",
+    "tickets_counters_delete": "AFTER DELETE ON tickets REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()",
+    "tickets_events_insert": "AFTER INSERT ON tickets REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_events_capture()",
+    "tickets_events_update": "AFTER UPDATE ON tickets REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_events_capture()",
+    "tickets_version_bump": "AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tickets "
+    "FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()",
+}
+
+# Monthly partitions on UTC month boundaries, from the upper bound of the newest partition
+# through the current month plus ``months_ahead``. The advisory lock serializes app instances
+# running this at startup; returns the number of partitions created.
+PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_partitions_ensure(months_ahead integer) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    this_month timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    target timestamptz := this_month + make_interval(months => months_ahead + 1);
+    covered timestamptz;
+    created integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('ticket_partitions_ensure'));
+    SELECT max(substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \\(''([^'']+)''\\)')::timestamptz)
+    INTO covered
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'tickets'::regclass;
+    covered := coalesce(covered, this_month);
+    WHILE covered < target LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF tickets FOR VALUES FROM (%L) TO (%L)',
+            'tickets_' || to_char(covered AT TIME ZONE 'UTC', 'YYYY_MM'),
+            covered,
+            covered + interval '1 month'
+        );
+        covered := covered + interval '1 month';
+        created := created + 1;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+# the key row goes with its ticket
+CONTENT_KEYS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_content_keys_release() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM ticket_content_keys k USING old_rows o
+    WHERE k.content_hash = o.content_hash AND k.ticket_id = o.id;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def _legacy_name(name: str) -> str:
+    return name.replace("tickets", "tickets_legacy", 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # the partition key must be NOT NULL; backfills and fixes below do not change counts or events
+    op.execute("SET LOCAL app.skip_ticket_counters = on")
+    op.execute("SET LOCAL app.skip_ticket_events = on")
+    op.execute("UPDATE tickets SET created_at = coalesce(updated_at, now()) WHERE created_at IS NULL")
+    op.alter_column("tickets", "created_at", nullable=False)
+
+    # A unique index on a partitioned table must contain the partition key, so duplicate
+    # detection moves to a small global table keyed by the hash that inserts claim first.
+    op.create_table(
+        "ticket_content_keys",
+        sa.Column("content_hash", sa.String(length=64), primary_key=True),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO ticket_content_keys (content_hash, ticket_id, created_at) "
+        "SELECT content_hash, id, created_at FROM tickets WHERE content_hash IS NOT NULL"
+    )
+    op.drop_index("uq_tickets_content_hash", table_name="tickets")
+
+    # The current heap becomes the first partition as is (no rewrite): the parent takes over
+    # its name, and each parent index adopts the matching legacy index instead of building one.
+    indexes = bind.execute(
+        sa.text(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = 'tickets' AND indexname <> 'tickets_pkey'"
+        )
+    ).all()
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER {name} ON tickets")
+    op.rename_table("tickets", "tickets_legacy")
+    for name, _ in indexes:
+        op.execute(f"ALTER INDEX {name} RENAME TO {_legacy_name(name)}")
+    op.drop_constraint("tickets_client_id_fkey", "tickets_legacy", type_="foreignkey")
+    op.drop_constraint("tickets_worker_id_fkey", "tickets_legacy", type_="foreignkey")
+    # replaced by the parent's (id, created_at) key; nothing references tickets.id by FK
+    op.drop_constraint("tickets_pkey", "tickets_legacy", type_="primary")
+
+    op.execute(
+        "CREATE TABLE tickets (LIKE tickets_legacy INCLUDING DEFAULTS INCLUDING GENERATED) "
+        "PARTITION BY RANGE (created_at)"
+    )
+    # dropping tickets_legacy some day must not take the id sequence with it
+    op.execute("ALTER SEQUENCE tickets_id_seq OWNED BY tickets.id")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            bound timestamptz := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                + interval '1 month';
+        BEGIN
+            -- rows already dated past this month stay in the legacy range too
+            SELECT greatest(bound, date_trunc('month', max(created_at) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                + interval '1 month')
+            INTO bound FROM tickets_legacy;
+            EXECUTE format(
+                'ALTER TABLE tickets ATTACH PARTITION tickets_legacy FOR VALUES FROM (MINVALUE) TO (%L)', bound
+            );
+        END
+        $$
+        """
+    )
+    op.create_primary_key("tickets_pkey", "tickets", ["id", "created_at"])
+    # FKs from a partitioned table are fine (only FKs *to* one need its full key)
+    op.create_foreign_key(
+        "tickets_client_id_fkey", "tickets", "clients", ["client_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_foreign_key(
+        "tickets_worker_id_fkey", "tickets", "users", ["worker_id"], ["id"], ondelete="SET NULL"
+    )
+    for _, definition in indexes:
+        op.execute(definition)
+    for name, definition in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {definition}")
+    op.execute(CONTENT_KEYS_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER tickets_content_keys_delete AFTER DELETE ON tickets "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION ticket_content_keys_release()"
+    )
+    op.execute(PARTITIONS_FUNCTION)
+    op.execute(f"SELECT ticket_partitions_ensure({MONTHS_AHEAD})")
+    op.execute("RESET app.skip_ticket_events")
+    op.execute("RESET app.skip_ticket_counters")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    columns = [
+        name
+        for (name,) in bind.execute(
+            sa.text(
+                "SELECT attname FROM pg_attribute WHERE attrelid = 'tickets'::regclass "
+                "AND attnum > 0 AND NOT attisdropped AND attgenerated = '' ORDER BY attnum"
+            )
+        )
+    ]
+    indexes = bind.execute(
+        sa.text(
+            "SELECT indexname FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = 'tickets_legacy' "
+            "AND indexname <> 'tickets_legacy_pkey'"
+        )
+    ).scalars().all()
+    op.execute("DROP TRIGGER IF EXISTS tickets_content_keys_delete ON tickets")
+    op.execute("DROP FUNCTION IF EXISTS ticket_content_keys_release()")
+    op.execute("DROP FUNCTION IF EXISTS ticket_partitions_ensure(integer)")
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER {name} ON tickets")
+
+    # fold every monthly partition back into the legacy heap
+    op.execute("ALTER TABLE tickets DETACH PARTITION tickets_legacy")
+    column_list = ", ".join(columns)
+    op.execute(f"INSERT INTO tickets_legacy ({column_list}) SELECT {column_list} FROM tickets")
+    op.execute("ALTER SEQUENCE tickets_id_seq OWNED BY tickets_legacy.id")
+    op.drop_table("tickets")
+    op.rename_table("tickets_legacy", "tickets")
+    for name in indexes:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('tickets_legacy', 'tickets', 1)}")
+    # the detached partition keeps copies of the parent's key and FKs
+    for (name,) in bind.execute(
+        sa.text("SELECT conname FROM pg_constraint WHERE conrelid = 'tickets'::regclass AND contype IN ('p', 'f')")
+    ).all():
+        op.execute(f'ALTER TABLE tickets DROP CONSTRAINT "{name}"')
+    op.create_primary_key("tickets_pkey", "tickets", ["id"])
+    op.create_foreign_key(
+        "tickets_client_id_fkey", "tickets", "clients", ["client_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_foreign_key(
+        "tickets_worker_id_fkey", "tickets", "users", ["worker_id"], ["id"], ondelete="SET NULL"
+    )
+    op.create_index("uq_tickets_content_hash", "tickets", ["content_hash"], unique=True)
+    for name, definition in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {definition}")
+    op.drop_table("ticket_content_keys")
+    op.alter_column("tickets", "created_at", nullable=True)
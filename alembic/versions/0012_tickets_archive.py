@@ -0,0 +1,116 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_tickets_archive"
+down_revision = "0011_ticket_partitions"
+branch_labels = None
+depends_on = None
+
+
+# archiving keeps the content key, so an archived ticket still counts as a duplicate
+CONTENT_KEYS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_content_keys_release() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('app.skip_ticket_content_keys', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM ticket_content_keys k USING old_rows o
+    WHERE k.content_hash = o.content_hash AND k.ticket_id = o.id;
+    RETURN NULL;
+END
+$$
+"""
+
+CONTENT_KEYS_FUNCTION_0011 = """
+CREATE OR REPLACE FUNCTION ticket_content_keys_release() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM ticket_content_keys k USING old_rows o
+    WHERE k.content_hash = o.content_hash AND k.ticket_id = o.id;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    # same columns (and search_vector expression) as tickets, so the two can be UNION ALL'd
+    op.execute("CREATE TABLE tickets_archive (LIKE tickets INCLUDING DEFAULTS INCLUDING GENERATED)")
+    # ids come from the archived tickets
+    op.execute("ALTER TABLE tickets_archive ALTER COLUMN id DROP DEFAULT")
+    op.add_column(
+        "tickets_archive",
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_primary_key("tickets_archive_pkey", "tickets_archive", ["id"])
+    op.create_foreign_key(
+        "tickets_archive_client_id_fkey", "tickets_archive", "clients", ["client_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_foreign_key(
+        "tickets_archive_worker_id_fkey", "tickets_archive", "users", ["worker_id"], ["id"], ondelete="SET NULL"
+    )
+    # the keyset orders of list_tickets/export, plus client_id for the FK cascade
+    op.create_index("ix_tickets_archive_created_at_id", "tickets_archive", ["created_at", "id"])
+    op.create_index("ix_tickets_archive_worker_created_at_id", "tickets_archive", ["worker_id", "created_at", "id"])
+    op.create_index("ix_tickets_archive_client_id", "tickets_archive", ["client_id"])
+    # search over the archive uses the same branches as over tickets (app.search)
+    op.create_index(
+        "ix_tickets_archive_search_vector", "tickets_archive", ["search_vector"], postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_tickets_archive_title_trgm",
+        "tickets_archive",
+        ["title"],
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_tickets_archive_description_trgm",
+        "tickets_archive",
+        ["description"],
+        postgresql_using="gin",
+        postgresql_ops={"description": "gin_trgm_ops"},
+    )
+    # the archival job picks done tickets by age
+    op.create_index(
+        "ix_tickets_done_at",
+        "tickets",
+        ["done_at"],
+        postgresql_where=sa.text("status = 'done'"),
+    )
+
+    op.execute(CONTENT_KEYS_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER tickets_archive_content_keys_delete AFTER DELETE ON tickets_archive "
+        "REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION ticket_content_keys_release()"
+    )
+    op.execute(
+        "CREATE TRIGGER tickets_archive_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+        "ON tickets_archive FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()"
+    )
+    op.execute("INSERT INTO table_versions (table_name, shard, version) VALUES ('tickets_archive', 0, 1)")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM table_versions WHERE table_name = 'tickets_archive'")
+    op.execute(CONTENT_KEYS_FUNCTION_0011)
+    op.drop_index("ix_tickets_done_at", table_name="tickets")
+    # archived tickets return to the hot table rather than being lost
+    op.execute("SET LOCAL app.skip_ticket_events = on")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            columns text;
+        BEGIN
+            SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO columns
+            FROM pg_attribute
+            WHERE attrelid = 'tickets'::regclass AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+            PERFORM ticket_partitions_ensure(0);
+            EXECUTE format('INSERT INTO tickets (%s) SELECT %s FROM tickets_archive', columns, columns);
+        END
+        $$
+        """
+    )
+    op.execute("RESET app.skip_ticket_events")
+    op.drop_table("tickets_archive")
@@ -0,0 +1,109 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0014_ticket_events_resume"
+down_revision = "0013_jobs"
+branch_labels = None
+depends_on = None
+
+
+# As 0009, plus old_worker_id: a reassignment also reaches the feed of the worker it left.
+EVENTS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_events_capture() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    lo bigint;
+    hi bigint;
+BEGIN
+    IF current_setting('app.skip_ticket_events', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        WITH ins AS (
+            INSERT INTO ticket_events (ticket_id, kind, status, worker_id, viewed)
+            SELECT id, 'created', status, worker_id, viewed FROM new_rows ORDER BY id
+            RETURNING id
+        )
+        SELECT min(id), max(id) INTO lo, hi FROM ins;
+    ELSE
+        WITH ins AS (
+            INSERT INTO ticket_events (ticket_id, kind, status, worker_id, old_worker_id, viewed)
+            SELECT n.id, k.kind, n.status, n.worker_id, o.worker_id, n.viewed
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES
+                    ('assigned', n.worker_id IS DISTINCT FROM o.worker_id),
+                    ('status', n.status IS DISTINCT FROM o.status),
+                    ('viewed', n.viewed IS DISTINCT FROM o.viewed)
+            ) AS k (kind, changed)
+            WHERE k.changed
+            ORDER BY n.id
+            RETURNING id
+        )
+        SELECT min(id), max(id) INTO lo, hi FROM ins;
+    END IF;
+    IF lo IS NOT NULL THEN
+        PERFORM pg_notify('ticket_events', lo || ':' || hi || ':' || txid_current());
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+EVENTS_FUNCTION_0009 = """
+CREATE OR REPLACE FUNCTION ticket_events_capture() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    lo bigint;
+    hi bigint;
+BEGIN
+    IF current_setting('app.skip_ticket_events', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        WITH ins AS (
+            INSERT INTO ticket_events (ticket_id, kind, status, worker_id, viewed)
+            SELECT id, 'created', status, worker_id, viewed FROM new_rows ORDER BY id
+            RETURNING id
+        )
+        SELECT min(id), max(id) INTO lo, hi FROM ins;
+    ELSE
+        WITH ins AS (
+            INSERT INTO ticket_events (ticket_id, kind, status, worker_id, viewed)
+            SELECT n.id, k.kind, n.status, n.worker_id, n.viewed
+            FROM new_rows n
+            JOIN old_rows o ON o.id = n.id
+            CROSS JOIN LATERAL (
+                VALUES
+                    ('assigned', n.worker_id IS DISTINCT FROM o.worker_id),
+                    ('status', n.status IS DISTINCT FROM o.status),
+                    ('viewed', n.viewed IS DISTINCT FROM o.viewed)
+            ) AS k (kind, changed)
+            WHERE k.changed
+            ORDER BY n.id
+            RETURNING id
+        )
+        SELECT min(id), max(id) INTO lo, hi FROM ins;
+    END IF;
+    IF lo IS NOT NULL THEN
+        PERFORM pg_notify('ticket_events', lo || ':' || hi || ':' || txid_current());
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.add_column("ticket_events", sa.Column("old_worker_id", sa.Integer(), nullable=True))
+    op.create_index("ix_ticket_events_old_worker_id_id", "ticket_events", ["old_worker_id", "id"])
+    # resuming replays events of transactions still open when the client's last event was read
+    op.create_index("ix_ticket_events_tx", "ticket_events", ["tx"])
+    op.execute(EVENTS_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(EVENTS_FUNCTION_0009)
+    op.drop_index("ix_ticket_events_tx", table_name="ticket_events")
+    op.drop_index("ix_ticket_events_old_worker_id_id", table_name="ticket_events")
+    op.drop_column("ticket_events", "old_worker_id")
@@ -0,0 +1,118 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015_ticket_counters_archive"
+down_revision = "0014_ticket_events_resume"
+branch_labels = None
+depends_on = None
+
+
+# As 0006, keyed also on ``archived`` (the table that fired): archiving a ticket moves its count
+# from the hot rows to the archived ones, so stats keep counting it and list totals can
+# leave it out.
+COUNTERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ticket_counters_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    stripe smallint := floor(random() * 16);
+    is_archived boolean := TG_TABLE_NAME = 'tickets_archive';
+BEGIN
+    IF current_setting('app.skip_ticket_counters', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ticket_counters AS c (worker_id, status, archived, shard, count)
+        SELECT coalesce(worker_id, 0), status, is_archived, stripe, count(*)
+        FROM new_rows GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, archived, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO ticket_counters AS c (worker_id, status, archived, shard, count)
+        SELECT coalesce(worker_id, 0), status, is_archived, stripe, -count(*)
+        FROM old_rows GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, archived, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO ticket_counters AS c (worker_id, status, archived, shard, count)
+        SELECT worker_id, status, is_archived, stripe, sum(delta)
+        FROM (
+            SELECT coalesce(worker_id, 0) AS worker_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT coalesce(worker_id, 0), status, 1 FROM new_rows
+        ) changes
+        GROUP BY 1, 2 HAVING sum(delta) <> 0 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, archived, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+COUNTERS_FUNCTION_0006 = """
+CREATE OR REPLACE FUNCTION ticket_counters_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    stripe smallint := floor(random() * 16);
+BEGIN
+    IF current_setting('app.skip_ticket_counters', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ticket_counters AS c (worker_id, status, shard, count)
+        SELECT coalesce(worker_id, 0), status, stripe, count(*)
+        FROM new_rows GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO ticket_counters AS c (worker_id, status, shard, count)
+        SELECT coalesce(worker_id, 0), status, stripe, -count(*)
+        FROM old_rows GROUP BY 1, 2 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO ticket_counters AS c (worker_id, status, shard, count)
+        SELECT worker_id, status, stripe, sum(delta)
+        FROM (
+            SELECT coalesce(worker_id, 0) AS worker_id, status, -1 AS delta FROM old_rows
+            UNION ALL
+            SELECT coalesce(worker_id, 0), status, 1 FROM new_rows
+        ) changes
+        GROUP BY 1, 2 HAVING sum(delta) <> 0 ORDER BY 1, 2
+        ON CONFLICT (worker_id, status, shard) DO UPDATE SET count = c.count + EXCLUDED.count;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+TRIGGERS = {
+    "tickets_archive_counters_insert": "AFTER INSERT ON tickets_archive REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()",
+    "tickets_archive_counters_update": "AFTER UPDATE ON tickets_archive "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()",
+    "tickets_archive_counters_delete": "AFTER DELETE ON tickets_archive REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION ticket_counters_sync()",
+}
+
+
+def upgrade() -> None:
+    # the archival job waits until the existing archive is counted
+    op.execute("LOCK TABLE tickets_archive IN SHARE MODE")
+    op.add_column(
+        "ticket_counters", sa.Column("archived", sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+    op.drop_constraint("pk_ticket_counters", "ticket_counters", type_="primary")
+    op.create_primary_key("pk_ticket_counters", "ticket_counters", ["worker_id", "status", "archived", "shard"])
+    op.execute(COUNTERS_FUNCTION)
+    for name, definition in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} {definition}")
+    op.execute(
+        "INSERT INTO ticket_counters (worker_id, status, archived, shard, count) "
+        "SELECT coalesce(worker_id, 0), status, true, 0, count(*) FROM tickets_archive GROUP BY 1, 2"
+    )
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE tickets_archive IN SHARE MODE")
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name} ON tickets_archive")
+    op.execute(COUNTERS_FUNCTION_0006)
+    op.execute("DELETE FROM ticket_counters WHERE archived")
+    op.drop_constraint("pk_ticket_counters", "ticket_counters", type_="primary")
+    op.drop_column("ticket_counters", "archived")
+    op.create_primary_key("pk_ticket_counters", "ticket_counters", ["worker_id", "status", "shard"])
@@ -0,0 +1,95 @@
+"""Archival of done tickets into the cold ``tickets_archive`` table.
+
+Tickets done for longer than ARCHIVE_AFTER_DAYS move in batches of ARCHIVE_BATCH_SIZE, each
+batch one DELETE ... RETURNING feeding an INSERT in its own short transaction, so the hot
+``tickets`` table (and its indexes) only hold recent and open work. Archived tickets keep
+their client and worker references and their content key (a resubmission is still a
+duplicate). ticket_counters count both tables (the move shifts a ticket to the archived
+rows), so stats still include archived tickets. Lists and exports include the archive only on
+``include_archived=true``.
+
+Usage: python -m app.archive run [--days N] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from .core.config import settings
+from .db import AsyncSessionLocal
+from .models import Ticket, TicketArchive
+
+
+# stored columns shared by both tables (search_vector is generated on each side)
+COLUMNS = [c.name for c in Ticket.__table__.c if c.computed is None]
+
+# SKIP LOCKED: a ticket being updated right now waits for the next run instead of blocking it
+ARCHIVE_SQL = f"""
+WITH moved AS (
+    DELETE FROM tickets t
+    USING (
+        SELECT id, created_at FROM tickets
+        WHERE status = 'done' AND done_at < :cutoff
+        ORDER BY done_at
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ) batch
+    WHERE t.id = batch.id AND t.created_at = batch.created_at
+    RETURNING t.*
+)
+INSERT INTO tickets_archive ({", ".join(COLUMNS)})
+SELECT {", ".join(COLUMNS)} FROM moved
+"""
+
+
+def tickets_with_archive():
+    """``Ticket`` over tickets UNION ALL tickets_archive, for queries built on Ticket columns."""
+    names = [c.name for c in Ticket.__table__.c]
+    union = union_all(
+        select(*(Ticket.__table__.c[name] for name in names)),
+        select(*(TicketArchive.__table__.c[name] for name in names)),
+    ).subquery("all_tickets")
+    return aliased(Ticket, union, adapt_on_names=True)
+
+
+async def archive_done(
+    db: AsyncSession, older_than: timedelta | None = None, batch_size: int | None = None
+) -> int:
+    """Move done tickets older than ``older_than`` (by done_at); returns how many moved."""
+    older_than = older_than or timedelta(days=settings.archive_after_days)
+    batch_size = batch_size or settings.archive_batch_size
+    cutoff = datetime.now(timezone.utc) - older_than
+    moved = 0
+    while True:
+        # the content keys stay behind for the archived rows
+        await db.execute(text("SET LOCAL app.skip_ticket_content_keys = on"))
+        result = await db.execute(text(ARCHIVE_SQL), {"cutoff": cutoff, "batch_size": batch_size})
+        await db.commit()
+        moved += result.rowcount
+        if result.rowcount < batch_size:
+            return moved
+
+
+async def _main(args: argparse.Namespace) -> int:
+    days = args.days if args.days is not None else settings.archive_after_days
+    async with AsyncSessionLocal() as db:
+        moved = await archive_done(db, timedelta(days=days), args.batch_size)
+    print(f"archived {moved} tickets done more than {days} days ago")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move old done tickets to tickets_archive")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--days", type=int, help="Archive tickets done more than this many days ago")
+    parser.add_argument("--batch-size", type=int, help="Tickets moved per transaction")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
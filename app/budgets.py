@@ -0,0 +1,87 @@
+"""Per-request SQL statement budgets and repeated-statement (N+1) detection.
+
+Routes declare how many statements they may run with ``dependencies=[query_budget(n)]``.
+QueryBudgetMiddleware checks the statements counted by app.metrics when the response starts:
+an overrun is logged (QUERY_BUDGET_MODE=warn) or raises QueryBudgetExceeded (raise, the mode
+app.testing switches on for the test suite). Statements of the same shape executed
+QUERY_REPEAT_THRESHOLD or more times in one request are logged as likely N+1 queries.
+"""
+
+import logging
+from collections.abc import Callable
+
+from fastapi import Depends
+
+from .core.config import settings
+from .metrics import RequestDbStats, request_db_stats
+
+
+logger = logging.getLogger(__name__)
+
+# called with (method, route, stats) once each request has finished
+observers: list[Callable[[str, str, RequestDbStats], None]] = []
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(limit: int):
+    """Route dependency capping the SQL statements one request may run."""
+
+    async def set_budget() -> None:
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.budget = limit
+
+    return Depends(set_budget)
+
+
+def raise_budget(extra: int) -> None:
+    """Allow the current request ``extra`` more statements, for work that scales with its input."""
+    stats = request_db_stats.get()
+    if stats is not None and stats.budget is not None:
+        stats.budget += extra
+
+
+def check(method: str, route: str, stats: RequestDbStats) -> None:
+    shapes = stats.shapes
+    repeated = {s: n for s, n in shapes.items() if n >= settings.query_repeat_threshold}
+    for shape, count in repeated.items():
+        logger.warning("%s %s ran one statement %d times (N+1?): %s", method, route, count, shape)
+    budget = stats.budget if stats.budget is not None else settings.query_budget_default
+    if not budget or stats.statements <= budget:
+        return
+    message = f"{method} {route} ran {stats.statements} SQL statements, budget is {budget}"
+    if settings.query_budget_mode == "raise":
+        details = "\n".join(f"  {count} x {shape}" for shape, count in shapes.most_common())
+        raise QueryBudgetExceeded(f"{message}:\n{details}")
+    logger.warning(message)
+
+
+class QueryBudgetMiddleware:
+    """Enforces route budgets; must sit inside MetricsMiddleware, which does the counting."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        stats = request_db_stats.get()
+        if scope["type"] != "http" or stats is None or settings.query_budget_mode == "off":
+            await self.app(scope, receive, send)
+            return
+
+        def route() -> str:
+            return getattr(scope.get("route"), "path", "unmatched")
+
+        async def send_checked(message):
+            # streamed bodies may query later; the budget covers the work before the first byte
+            if message["type"] == "http.response.start":
+                check(scope["method"], route(), stats)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_checked)
+        finally:
+            for observer in observers:
+                observer(scope["method"], route(), stats)
@@ -12,9 +12,86 @@ class Settings(BaseModel):
             "postgresql+asyncpg://postgres:postgres@db:5432/app",
         )
     )
+    # read replicas (comma-separated) for read-only endpoints; a user who committed within
+    # READ_YOUR_WRITES_SECONDS keeps reading from the primary (read_primary_until cookie)
+    database_replica_urls: list[str] = [
+        url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ]
+    read_your_writes_seconds: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # connection pool; DB_PGBOUNCER=true for pgbouncer in transaction mode (no server-side
+    # prepared statement reuse)
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout_seconds: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    db_pool_recycle_seconds: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes", "on")
+    db_statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    db_pgbouncer: bool = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes", "on")
+    # SQL statements per request: routes declare budgets with app.budgets.query_budget(n);
+    # QUERY_BUDGET_MODE is warn (log overruns), raise (fail the request, used in tests) or off.
+    # QUERY_BUDGET_DEFAULT applies to routes without a budget (0 = unlimited)
+    query_budget_mode: str = os.getenv("QUERY_BUDGET_MODE", "warn")
+    query_budget_default: int = int(os.getenv("QUERY_BUDGET_DEFAULT", "0"))
+    query_repeat_threshold: int = int(os.getenv("QUERY_REPEAT_THRESHOLD", "3"))
     env: str = os.getenv("ENV", "dev")
     oauth_client_id: str = os.getenv("OAUTH_CLIENT_ID", "crm-client")
     oauth_client_secret: str = os.getenv("OAUTH_CLIENT_SECRET", "crm-secret")
+    # resolved JWT principals kept in-process; size 0 disables the cache
+    principal_cache_size: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+    principal_cache_ttl_seconds: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    # bcrypt runs in a dedicated thread pool; calls beyond workers + queue limit get 503
+    password_hash_workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    password_hash_queue_limit: int = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
+    # POST /public/tickets/batch: records per request and per insert transaction; body size and
+    # NDJSON line length are capped while reading (413 past any limit)
+    public_batch_max_records: int = int(os.getenv("PUBLIC_BATCH_MAX_RECORDS", "10000"))
+    public_batch_chunk_size: int = int(os.getenv("PUBLIC_BATCH_CHUNK_SIZE", "500"))
+    public_batch_max_bytes: int = int(os.getenv("PUBLIC_BATCH_MAX_BYTES", str(16 * 1024 * 1024)))
+    public_batch_max_line_bytes: int = int(os.getenv("PUBLIC_BATCH_MAX_LINE_BYTES", "65536"))
+    # /admin/seed routes (POST /admin/seed/faker runs app.datagen) are only mounted when enabled
+    admin_seed_enabled: bool = os.getenv("ADMIN_SEED_ENABLED", "false").lower() in (
+        "1", "true", "yes", "on"
+    )
+    datagen_api_max_tickets: int = int(os.getenv("DATAGEN_API_MAX_TICKETS", "10000"))
+    # tickets is partitioned by month of created_at: partitions kept ready beyond the current
+    # month, and how often the API re-checks (app.partitions)
+    ticket_partitions_ahead: int = int(os.getenv("TICKET_PARTITIONS_AHEAD", "3"))
+    ticket_partitions_check_hours: float = float(os.getenv("TICKET_PARTITIONS_CHECK_HOURS", "24"))
+    # app.archive: done tickets older than this move to tickets_archive, this many per transaction
+    archive_after_days: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+    archive_batch_size: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+    # app.jobs: each API process runs a worker with this many concurrent jobs unless disabled
+    # (then run python -m app.jobs work); idle workers poll every JOBS_POLL_SECONDS
+    jobs_worker_in_process: bool = os.getenv("JOBS_WORKER_IN_PROCESS", "true").lower() in (
+        "1", "true", "yes", "on"
+    )
+    jobs_concurrency: int = int(os.getenv("JOBS_CONCURRENCY", "2"))
+    jobs_poll_seconds: float = float(os.getenv("JOBS_POLL_SECONDS", "1"))
+    # handlers are cut off after JOBS_TIMEOUT_SECONDS (at most 80% of the lease); a job whose
+    # worker died is reclaimed once the lease lapses; both count as failed attempts
+    jobs_timeout_seconds: float = float(os.getenv("JOBS_TIMEOUT_SECONDS", "240"))
+    jobs_lease_seconds: float = float(os.getenv("JOBS_LEASE_SECONDS", "300"))
+    # retry delay doubles per failed attempt from the base, up to the max
+    jobs_backoff_base_seconds: float = float(os.getenv("JOBS_BACKOFF_BASE_SECONDS", "5"))
+    jobs_backoff_max_seconds: float = float(os.getenv("JOBS_BACKOFF_MAX_SECONDS", "3600"))
+    # users.purge job: tickets unassigned per transaction
+    user_purge_batch_size: int = int(os.getenv("USER_PURGE_BATCH_SIZE", "5000"))
+    # tickets.status_changed jobs POST here; unset, they are only logged
+    client_notify_webhook_url: str = os.getenv("CLIENT_NOTIFY_WEBHOOK_URL", "")
+    client_notify_timeout_seconds: float = float(os.getenv("CLIENT_NOTIFY_TIMEOUT_SECONDS", "10"))
+    # GET /tickets/export: rows fetched per server-side cursor round trip
+    export_fetch_size: int = int(os.getenv("EXPORT_FETCH_SIZE", "2000"))
+    # GET /tickets/events: keepalive interval, per-client buffer, max events replayed on resume
+    events_heartbeat_seconds: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    events_queue_size: int = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+    events_replay_limit: int = int(os.getenv("EVENTS_REPLAY_LIMIT", "10000"))
+    # LISTEN needs a session that outlives transactions: point this past pgbouncer's
+    # transaction mode (directly at Postgres or a session-mode pool)
+    events_database_url: str = Field(
+        default_factory=lambda: os.getenv("EVENTS_DATABASE_URL") or os.getenv(
+            "DATABASE_URL", "postgresql+asyncpg://postgres:postgres@db:5432/app"
+        )
+    )
 
 
 settings = Settings()
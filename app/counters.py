@@ -0,0 +1,135 @@
+"""Ticket count rollup: O(1) lookups plus drift verification and rebuild.
+
+The rollup covers ``tickets`` and ``tickets_archive``, keyed by ``archived``: stats count both,
+list totals only the tables listed.
+
+Usage: python -m app.counters verify|rebuild
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import case, false, func, literal, select, text, true, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db import AsyncSessionLocal
+from .models import Ticket, TicketArchive, TicketCounter, TicketStatus
+
+
+UNASSIGNED = 0
+
+
+async def count_tickets(
+    db: AsyncSession,
+    worker_id: int | None = None,
+    status: TicketStatus | None = None,
+    include_archived: bool = False,
+) -> int:
+    query = select(func.coalesce(func.sum(TicketCounter.count), 0))
+    if not include_archived:
+        query = query.where(TicketCounter.archived.is_(false()))
+    if worker_id is not None:
+        query = query.where(TicketCounter.worker_id == worker_id)
+    if status is not None:
+        query = query.where(TicketCounter.status == status)
+    return int((await db.execute(query)).scalar())
+
+
+async def grouped_counts(
+    db: AsyncSession, worker_ids: list[int] | None = None
+) -> list[tuple[int | None, TicketStatus, int]]:
+    """(worker_id, status, count) rows over hot and archived tickets; worker_id None means unassigned."""
+    worker_id = case((TicketCounter.worker_id == UNASSIGNED, None), else_=TicketCounter.worker_id)
+    query = (
+        select(worker_id, TicketCounter.status, func.sum(TicketCounter.count))
+        .group_by(TicketCounter.worker_id, TicketCounter.status)
+        .having(func.sum(TicketCounter.count) != 0)
+    )
+    if worker_ids:
+        query = query.where(TicketCounter.worker_id.in_([UNASSIGNED, *worker_ids]))
+    return [(w, s, int(c)) for w, s, c in (await db.execute(query)).all()]
+
+
+def _grouped(table, archived):
+    worker_id = func.coalesce(table.c.worker_id, literal(UNASSIGNED))
+    return select(worker_id, table.c.status, archived, func.count()).group_by(worker_id, table.c.status)
+
+
+async def _actual_counts(db: AsyncSession) -> dict[tuple[int, TicketStatus, bool], int]:
+    rows = await db.execute(
+        union_all(_grouped(Ticket.__table__, false()), _grouped(TicketArchive.__table__, true()))
+    )
+    return {(w, s, a): c for w, s, a, c in rows.all()}
+
+
+async def _rollup_counts(db: AsyncSession) -> dict[tuple[int, TicketStatus, bool], int]:
+    rows = await db.execute(
+        select(
+            TicketCounter.worker_id, TicketCounter.status, TicketCounter.archived, func.sum(TicketCounter.count)
+        ).group_by(TicketCounter.worker_id, TicketCounter.status, TicketCounter.archived)
+    )
+    return {(w, s, a): int(c) for w, s, a, c in rows.all() if c}
+
+
+async def verify(db: AsyncSession) -> list[dict]:
+    """Compare the rollup with a full count; returns one entry per drifting key."""
+    # one snapshot for both reads so concurrent writes cannot show up as drift
+    await db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+    actual = await _actual_counts(db)
+    rollup = await _rollup_counts(db)
+    await db.rollback()
+    drift = []
+    for key in sorted(actual.keys() | rollup.keys(), key=lambda k: (k[0], k[1].value, k[2])):
+        if actual.get(key, 0) != rollup.get(key, 0):
+            drift.append(
+                {
+                    "worker_id": key[0],
+                    "status": key[1].value,
+                    "archived": key[2],
+                    "expected": actual.get(key, 0),
+                    "actual": rollup.get(key, 0),
+                }
+            )
+    return drift
+
+
+async def rebuild(db: AsyncSession) -> None:
+    # SHARE mode blocks ticket writes (and so trigger updates) for the duration
+    await db.execute(text("LOCK TABLE tickets, tickets_archive IN SHARE MODE"))
+    await db.execute(text("DELETE FROM ticket_counters"))
+    await db.execute(
+        text(
+            "INSERT INTO ticket_counters (worker_id, status, archived, shard, count) "
+            "SELECT coalesce(worker_id, 0), status, false, 0, count(*) FROM tickets GROUP BY 1, 2 "
+            "UNION ALL "
+            "SELECT coalesce(worker_id, 0), status, true, 0, count(*) FROM tickets_archive GROUP BY 1, 2"
+        )
+    )
+    await db.commit()
+
+
+async def _main(command: str) -> int:
+    async with AsyncSessionLocal() as db:
+        if command == "rebuild":
+            await rebuild(db)
+            print("ticket_counters rebuilt")
+            return 0
+        drift = await verify(db)
+        for entry in drift:
+            print(
+                f"drift worker_id={entry['worker_id']} status={entry['status']} archived={entry['archived']} "
+                f"expected={entry['expected']} actual={entry['actual']}"
+            )
+        print("ticket_counters OK" if not drift else f"{len(drift)} drifting keys")
+        return 1 if drift else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Verify or rebuild the ticket_counters rollup")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.command)))
+
+
+if __name__ == "__main__":
+    main()
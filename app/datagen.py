@@ -0,0 +1,401 @@
+"""Synthetic clients, workers and tickets loaded with COPY.
+
+Usage: python -m app.datagen --tickets 10m [--clients N] [--workers 50] [--days 365]
+                             [--jobs 4] [--chunk-size 100000] [--seed N] [--defer-indexes]
+
+Ticket ages lean towards recent days and older tickets are mostly done; ``assigned_at``,
+``in_progress_at`` and ``done_at`` follow from the status in that order and never lie in the
+future. Workload is skewed towards a few busy workers. Tickets are generated and COPY'd in
+chunks of ``--chunk-size`` rows, ``--jobs`` worker processes at a time, each chunk in its own
+transaction with the counter and change-feed triggers skipped; ticket_counters is rebuilt at
+the end. Client and ticket IDs are reserved up front, so tickets can reference clients and
+their ``ticket_content_keys`` rows can be COPY'd with them, without a lookup.
+For millions of rows on an otherwise idle database add ``--defer-indexes``.
+``POST /admin/seed/faker`` runs the same generator in-process, capped at
+DATAGEN_API_MAX_TICKETS.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import multiprocessing
+import random
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+from sqlalchemy.engine import make_url
+
+from .core.config import settings
+from .counters import rebuild
+from .db import AsyncSessionLocal
+from .models import TicketStatus
+from .security import hash_password
+
+
+FIRST_NAMES = (
+    "Anna", "Boris", "Chen", "Daria", "Elif", "Farid", "Grace", "Hugo", "Ines", "Jonas",
+    "Kira", "Liam", "Maya", "Nikolai", "Olga", "Pavel", "Quinn", "Rosa", "Sami", "Tara",
+)
+LAST_NAMES = (
+    "Ivanova", "Smith", "Garcia", "Kowalski", "Nguyen", "Petrov", "Muller", "Rossi", "Sato",
+    "Haddad", "Novak", "Olsen", "Silva", "Kim", "Baker", "Horvat", "Fischer", "Lopez",
+)
+DEVICES = ("laptop", "phone", "tablet", "printer", "monitor", "router", "desktop PC", "smartwatch")
+ISSUES = (
+    "Broken screen", "Battery drains fast", "Does not power on", "Keyboard keys stuck",
+    "Overheating", "Wi-Fi keeps dropping", "Cracked case", "Very slow to boot",
+    "No sound", "Charging port loose", "Water damage", "Camera not working",
+)
+DETAILS = (
+    "Started after a system update.", "Happens intermittently, mostly in the evening.",
+    "The device was dropped last week.", "Customer needs it back urgently.",
+    "Already tried a factory reset.", "Only happens on battery power.",
+    "Warranty may still apply.", "Second time this month.",
+)
+USER_AGENTS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4)",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X)",
+    "Mozilla/5.0 (Linux; Android 14)",
+)
+TICKET_COLUMNS = (
+    "id", "title", "description", "status", "client_id", "worker_id", "created_at", "updated_at",
+    "viewed", "assigned_at", "in_progress_at", "done_at", "requester_ip", "requester_ua",
+    "content_hash",
+)
+CLIENT_COLUMNS = ("id", "name", "email", "phone", "created_at")
+CONTENT_KEY_COLUMNS = ("content_hash", "ticket_id", "created_at")
+# status weights (new, in_progress, done) by ticket age
+STATUS_BY_AGE = ((3, (50, 30, 20)), (30, (15, 35, 50)), (None, (2, 5, 93)))
+STATUSES = (TicketStatus.new.value, TicketStatus.in_progress.value, TicketStatus.done.value)
+# mean hours from created to assigned, assigned to in_progress, in_progress to done
+MEAN_HOURS = (4, 8, 48)
+
+
+def _dsn() -> str:
+    return make_url(settings.database_url).set(drivername="postgresql").render_as_string(
+        hide_password=False
+    )
+
+
+async def _connect() -> asyncpg.Connection:
+    # COPY runs fine through pgbouncer; only asyncpg's statement cache has to go
+    return await asyncpg.connect(_dsn(), statement_cache_size=0 if settings.db_pgbouncer else 100)
+
+
+def parse_count(value: str) -> int:
+    value = value.strip().lower()
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[: -len(suffix)]) * factor)
+    return int(value)
+
+
+def _client(index: int, run: str) -> tuple[str, str]:
+    first = FIRST_NAMES[index % len(FIRST_NAMES)]
+    last = LAST_NAMES[index // len(FIRST_NAMES) % len(LAST_NAMES)]
+    return f"{first} {last}", f"{first}.{last}.{run}{index}@example.com".lower()
+
+
+def _content_hash(title: str, description: str, email: str) -> str:
+    # app.models.ticket_content_hash for text that is already single-spaced
+    raw = f"{title.lower()}\x1f{description.lower()}\x1f{email}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def client_rows(start: int, stop: int, run: str, first_id: int, now: datetime, days: int):
+    rng = random.Random(f"{run}-clients-{start}")
+    for index in range(start, stop):
+        name, email = _client(index, run)
+        phone = f"+1{rng.randrange(200, 999)}{rng.randrange(1_000_000, 9_999_999)}"
+        created_at = now - timedelta(days=days * rng.random(), hours=1)
+        yield (first_id + index, name, email, phone, created_at)
+
+
+def ticket_rows(
+    start: int,
+    stop: int,
+    run: str,
+    first_id: int,
+    first_client_id: int,
+    clients: int,
+    worker_ids: list[int],
+    now: datetime,
+    days: int,
+):
+    rng = random.Random(f"{run}-tickets-{start}")
+    # Zipf-like: the first workers carry most of the load
+    cum_weights, total = [], 0.0
+    for rank in range(len(worker_ids)):
+        total += 1 / (rank + 1) ** 0.8
+        cum_weights.append(total)
+    for index in range(start, stop):
+        client = rng.randrange(clients)
+        _, email = _client(client, run)
+        age = timedelta(days=days * rng.random() ** 2)
+        created_at = now - age
+        weights = next(w for limit, w in STATUS_BY_AGE if limit is None or age.days < limit)
+        status = rng.choices(STATUSES, weights)[0]
+        worker_id = None
+        if worker_ids and (status != TicketStatus.new.value or rng.random() < 0.5):
+            worker_id = rng.choices(worker_ids, cum_weights=cum_weights)[0]
+        steps = [
+            worker_id is not None,
+            status != TicketStatus.new.value,
+            status == TicketStatus.done.value,
+        ]
+        stamps = []
+        stamp = created_at
+        for taken, mean_hours in zip(steps, MEAN_HOURS):
+            if taken:
+                stamp = min(stamp + timedelta(hours=rng.expovariate(1 / mean_hours)), now)
+            stamps.append(stamp if taken else None)
+        assigned_at, in_progress_at, done_at = stamps
+        device = rng.choice(DEVICES)
+        title = f"{rng.choice(ISSUES)} ({device})"
+        description = f"{rng.choice(DETAILS)} Customer's {device}, reference {run}-{index}."
+        yield (
+            first_id + index,
+            title,
+            description,
+            status,
+            first_client_id + client,
+            worker_id,
+            created_at,
+            stamp,
+            status != TicketStatus.new.value or rng.random() < 0.3,
+            assigned_at,
+            in_progress_at,
+            done_at,
+            ".".join(str(rng.randrange(1, 224 if octet == 0 else 255)) for octet in range(4)),
+            rng.choice(USER_AGENTS),
+            _content_hash(title, description, email),
+        )
+
+
+async def _copy(conn: asyncpg.Connection, *loads: tuple[str, tuple[str, ...], list]) -> int:
+    """COPY each (table, columns, rows) in one transaction; returns the rows of the first."""
+    async with conn.transaction():
+        await conn.execute("SET LOCAL app.skip_ticket_counters = on")
+        await conn.execute("SET LOCAL app.skip_ticket_events = on")
+        for table, columns, rows in loads:
+            await conn.copy_records_to_table(table, records=rows, columns=columns)
+    return len(loads[0][2])
+
+
+async def _load_chunk(kind: str, start: int, stop: int, params: dict) -> int:
+    conn = await _connect()
+    try:
+        # row generation is CPU-bound; off the event loop when running inside the API process
+        if kind == "clients":
+            rows = await asyncio.to_thread(lambda: list(client_rows(start, stop, **params)))
+            return await _copy(conn, ("clients", CLIENT_COLUMNS, rows))
+        rows = await asyncio.to_thread(lambda: list(ticket_rows(start, stop, **params)))
+        # tickets carry reserved ids, so their content keys can go in alongside them
+        keys = [(row[-1], row[0], row[6]) for row in rows]
+        return await _copy(
+            conn, ("tickets", TICKET_COLUMNS, rows), ("ticket_content_keys", CONTENT_KEY_COLUMNS, keys)
+        )
+    finally:
+        await conn.close()
+
+
+def _load_chunk_in_process(kind: str, start: int, stop: int, params: dict) -> int:
+    return asyncio.run(_load_chunk(kind, start, stop, params))
+
+
+async def _reserve_ids(conn: asyncpg.Connection, table: str, count: int) -> int:
+    """First of ``count`` consecutive ``table`` IDs nobody else will get from the sequence."""
+    async with conn.transaction():
+        # Inserts take ROW EXCLUSIVE, so none of them can run in between. Public ticket
+        # submissions draw ticket ids while claiming a content key, before touching tickets,
+        # so the keys table is locked as well.
+        if table == "tickets":
+            await conn.execute("LOCK TABLE ticket_content_keys IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        first = await conn.fetchval(
+            f"SELECT greatest(nextval(pg_get_serial_sequence('{table}', 'id')), "
+            f"(SELECT coalesce(max(id), 0) + 1 FROM {table}))"
+        )
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), $1)", first + count - 1
+        )
+    return first
+
+
+async def _create_workers(
+    conn: asyncpg.Connection, count: int, run: str, password: str
+) -> list[int]:
+    password_hash = await hash_password(password)
+    rows = await conn.fetch(
+        "INSERT INTO users (username, password_hash, role, created_at) "
+        "SELECT 'worker_' || $1 || '_' || g, $2, 'worker', now() FROM generate_series(1, $3) g "
+        "RETURNING id",
+        run,
+        password_hash,
+        count,
+    )
+    return [row["id"] for row in rows]
+
+
+async def _run_chunks(kind: str, total: int, chunk_size: int, jobs: int, params: dict) -> None:
+    chunks = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    started = time.perf_counter()
+    if jobs <= 1:
+        for start, stop in chunks:
+            await _load_chunk(kind, start, stop, params)
+        return
+    loop = asyncio.get_running_loop()
+    # spawn: a forked child would inherit this process's event loop and connection pool
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        futures = [
+            loop.run_in_executor(pool, _load_chunk_in_process, kind, start, stop, params)
+            for start, stop in chunks
+        ]
+        loaded = 0
+        for future in asyncio.as_completed(futures):
+            loaded += await future
+            rate = loaded / max(time.perf_counter() - started, 1e-9)
+            print(f"{kind}: {loaded}/{total} ({rate:,.0f} rows/s)", end="\r", flush=True)
+    print()
+
+
+async def _drop_secondary_indexes(conn: asyncpg.Connection) -> list[str]:
+    """Drop the non-unique ticket indexes and return their definitions."""
+    rows = await conn.fetch(
+        "SELECT indexname, indexdef FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = 'tickets' "
+        "AND indexdef NOT LIKE 'CREATE UNIQUE INDEX%'"
+    )
+    # dropping a partitioned index drops it on every partition
+    for row in rows:
+        await conn.execute(f'DROP INDEX "{row["indexname"]}"')
+    # pg_indexes shows partitioned indexes as "ON ONLY tickets", which would recreate an
+    # invalid parent-only index; without ONLY the index is built on every partition again
+    return [row["indexdef"].replace(" ON ONLY ", " ON ", 1) for row in rows]
+
+
+async def _create_indexes(definitions: list[str], jobs: int) -> None:
+    pending = list(definitions)
+
+    async def build() -> None:
+        conn = await _connect()
+        try:
+            await conn.execute("SET maintenance_work_mem = '512MB'")
+            while pending:
+                definition = pending.pop()
+                print(definition)
+                await conn.execute(definition)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(build() for _ in range(max(1, min(jobs, len(pending))))))
+
+
+async def generate(
+    tickets: int,
+    clients: int | None = None,
+    workers: int = 20,
+    days: int = 365,
+    jobs: int = 1,
+    chunk_size: int = 100_000,
+    seed: str | None = None,
+    password: str = "worker123",
+    defer_indexes: bool = False,
+) -> dict:
+    """Generate and load a dataset; ``workers=0`` spreads tickets over the existing workers.
+
+    ``defer_indexes`` drops the secondary ticket indexes for the load and rebuilds them after,
+    which is much faster for millions of rows but leaves other queries without them meanwhile.
+    """
+    run = seed or secrets.token_hex(3)
+    clients = clients or max(1, tickets // 3)
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    conn = await _connect()
+    try:
+        if workers:
+            worker_ids = await _create_workers(conn, workers, run, password)
+        else:
+            rows = await conn.fetch("SELECT id FROM users WHERE role = 'worker' AND disabled_at IS NULL ORDER BY id")
+            worker_ids = [row["id"] for row in rows]
+        first_client_id = await _reserve_ids(conn, "clients", clients)
+        first_ticket_id = await _reserve_ids(conn, "tickets", tickets)
+        deferred = await _drop_secondary_indexes(conn) if defer_indexes else []
+    finally:
+        await conn.close()
+    common = {"run": run, "now": now, "days": days}
+    await _run_chunks(
+        "clients", clients, chunk_size, jobs, {**common, "first_id": first_client_id}
+    )
+    ticket_params = {
+        **common,
+        "first_id": first_ticket_id,
+        "first_client_id": first_client_id,
+        "clients": clients,
+        "worker_ids": worker_ids,
+    }
+    try:
+        await _run_chunks("tickets", tickets, chunk_size, jobs, ticket_params)
+    finally:
+        await _create_indexes(deferred, jobs)
+    async with AsyncSessionLocal() as db:
+        await rebuild(db)
+    return {
+        "run": run,
+        "clients": clients,
+        "workers": len(worker_ids),
+        "tickets": tickets,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+async def _main(args: argparse.Namespace) -> None:
+    result = await generate(
+        tickets=args.tickets,
+        clients=args.clients,
+        workers=args.workers,
+        days=args.days,
+        jobs=args.jobs,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        password=args.password,
+        defer_indexes=args.defer_indexes,
+    )
+    conn = await _connect()
+    try:
+        await conn.execute("ANALYZE users, clients, tickets, ticket_content_keys, ticket_counters")
+    finally:
+        await conn.close()
+    rate = result["tickets"] / max(result["seconds"], 0.1)
+    print(
+        f"run {result['run']}: {result['tickets']} tickets, {result['clients']} clients, "
+        f"{result['workers']} workers in {result['seconds']}s ({rate:,.0f} tickets/s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load synthetic CRM data with COPY")
+    parser.add_argument("--tickets", type=parse_count, required=True, help="e.g. 50000, 1m, 10m")
+    parser.add_argument("--clients", type=parse_count, help="default: tickets / 3")
+    parser.add_argument("--workers", type=int, default=20, help="new workers; 0 uses existing")
+    parser.add_argument("--password", default="worker123", help="password of the new workers")
+    parser.add_argument("--days", type=int, default=365, help="spread tickets over this many days")
+    parser.add_argument("--jobs", type=int, default=4, help="parallel COPY processes")
+    parser.add_argument("--chunk-size", type=parse_count, default=100_000)
+    parser.add_argument("--seed", help="run tag and RNG seed; reuse only on an empty database")
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="drop secondary ticket indexes during the load and rebuild them after",
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
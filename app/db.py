@@ -1,17 +1,229 @@
+import itertools
+import math
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
 from typing import AsyncGenerator
+from uuid import uuid4
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from fastapi import Request
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .core.config import settings
+from .metrics import instrument_engine
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, echo=False, pool_pre_ping=True)
-AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+# time spent opening new connections inside the current checkout, kept out of the wait time
+_connect_seconds: ContextVar[float] = ContextVar("_connect_seconds", default=0.0)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        token = _connect_seconds.set(0.0)
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start - _connect_seconds.get()
+            _connect_seconds.reset(token)
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            self.connects += 1
+            _connect_seconds.set(_connect_seconds.get() + time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connects": self.connects,
+            "wait_ms_avg": round(self.wait_seconds_total / max(self.checkouts, 1) * 1000, 3),
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
+
+
+def _connect_args() -> dict:
+    if settings.db_pgbouncer:
+        # pgbouncer (transaction mode) may hand each transaction a different server connection:
+        # never reuse prepared statements and give each one a unique name
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": settings.db_statement_cache_size}
+
+
+def _make_engine(url: str) -> AsyncEngine:
+    async_engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=_connect_args(),
+    )
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+class RecentWriters:
+    """Token subjects that committed within the last ``ttl_seconds`` (per process).
+
+    Other app instances learn about the write from the ``read_primary_until`` cookie instead.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self._until: OrderedDict[str, float] = OrderedDict()
+
+    def mark(self, subject: str) -> None:
+        self._until[subject] = time.monotonic() + self.ttl_seconds
+        self._until.move_to_end(subject)
+        while len(self._until) > self.maxsize:
+            self._until.popitem(last=False)
+
+    def __contains__(self, subject: str) -> bool:
+        until = self._until.get(subject)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self._until[subject]
+            return False
+        return True
+
+
+# set on responses to requests that committed; reads carrying it go to the primary on any instance
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+
+def _cookie_pins_primary(request) -> bool:
+    try:
+        until = float(request.cookies.get(READ_PRIMARY_COOKIE, ""))
+    except (AttributeError, ValueError):
+        return False
+    now = time.time()
+    # a client can only pin itself, and no further ahead than one window
+    return now < until <= now + settings.read_your_writes_seconds
+
+
+class ReadYourWritesMiddleware:
+    """Sets the ``read_primary_until`` cookie on responses to requests that committed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_engines:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message):
+            until = scope.get("state", {}).get("read_primary_until")
+            if message["type"] == "http.response.start" and until is not None:
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}={until:.3f}; Max-Age={math.ceil(settings.read_your_writes_seconds)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
+
+
+engine = _make_engine(settings.database_url)
+replica_engines = [_make_engine(url) for url in settings.database_replica_urls]
+_replica_cycle = itertools.cycle(replica_engines)
+recent_writers = RecentWriters(settings.read_your_writes_seconds)
+
+
+class PrimarySession(Session):
+    pass
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_writer(session: Session) -> None:
+    # reads only ever close their session, so a commit means this subject just wrote
+    subject = session.info.get("subject")
+    if subject:
+        recent_writers.mark(subject)
+    request = session.info.get("request")
+    if request is not None:
+        request.state.read_primary_until = time.time() + settings.read_your_writes_seconds
+
+
+class ReadSession(Session):
+    """Session for read-only endpoints: a replica, unless the caller wrote recently.
+
+    A recent write is known from this process's ``recent_writers`` or from the request's
+    ``read_primary_until`` cookie, set by whichever instance served the write.
+
+    The engine is picked at the first statement, after authentication has put the token
+    subject on ``request.state``, and then kept for the whole session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = self.info.get("bind")
+        if bind is None:
+            request = self.info.get("request")
+            subject = self.info.get("subject") or getattr(getattr(request, "state", None), "subject", None)
+            if not replica_engines or (subject and subject in recent_writers) or _cookie_pins_primary(request):
+                bind = engine.sync_engine
+            else:
+                bind = next(_replica_cycle).sync_engine
+            self.info["bind"] = bind
+        return bind
+
+
+AsyncSessionLocal = async_sessionmaker(
+    engine, expire_on_commit=False, class_=AsyncSession, sync_session_class=PrimarySession
+)
+ReadSessionLocal = async_sessionmaker(
+    expire_on_commit=False, class_=AsyncSession, sync_session_class=ReadSession
+)
+
+
+def pool_stats() -> dict:
+    return engine.pool.stats()
+
+
+def replica_pool_stats() -> list[dict]:
+    return [e.pool.stats() for e in replica_engines]
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -19,3 +231,7 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Like get_db, but served by a read replica when configured (read-your-writes aware)."""
+    async with ReadSessionLocal(info={"request": request}) as session:
+        yield session
@@ -0,0 +1,240 @@
+"""Ticket change feed: ticket_events rows fanned out per process over LISTEN/NOTIFY.
+
+Triggers on ``tickets`` write the events and NOTIFY ``lo:hi:tx`` once per statement; each API
+process keeps one listening connection, reads those rows back and hands them to its SSE
+subscribers.
+
+Event ids follow insert order, not commit order: a transaction can commit an event with a lower
+id after a higher one was sent. So an event's SSE id is the cursor ``id:xmin``, where ``xmin``
+is the oldest transaction still running when the event was read. Resuming from it replays events
+past ``id`` plus every event of a transaction from ``xmin`` on, which covers anything that
+committed late; clients may see such events twice and should drop repeated ids.
+
+Usage: python -m app.events prune [--days N]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+from sqlalchemy import delete, literal_column, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .core.config import settings
+from .db import AsyncSessionLocal
+from .models import TicketEvent
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ticket_events"
+# oldest transaction still in progress for the reading snapshot; see the module docstring
+SNAPSHOT_XMIN = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+FETCH_NOTIFIED = (
+    "SELECT id, ticket_id, kind, status::text AS status, worker_id, old_worker_id, viewed, "
+    f"created_at, {SNAPSHOT_XMIN} AS xmin "
+    "FROM ticket_events WHERE id BETWEEN $1 AND $2 AND tx = $3 ORDER BY id"
+)
+
+
+def event_out(row) -> dict:
+    status = row["status"]
+    return {
+        "id": row["id"],
+        "cursor": f"{row['id']}:{row['xmin']}",
+        "ticket_id": row["ticket_id"],
+        "kind": row["kind"],
+        "status": getattr(status, "value", status),
+        "worker_id": row["worker_id"],
+        "old_worker_id": row["old_worker_id"],
+        "viewed": row["viewed"],
+        "created_at": row["created_at"].isoformat(),
+    }
+
+
+# both parts are bound as bigint: the event id column, and xmin as the xid8::bigint it was read as
+BIGINT_MAX = 2**63 - 1
+
+
+def parse_cursor(value: str) -> tuple[int, int | None]:
+    """``id:xmin`` from an event's SSE id (a bare id, from older clients, resumes by id alone)."""
+    raw_id, _, raw_xmin = value.partition(":")
+    after_id = int(raw_id)
+    after_xmin = int(raw_xmin) if raw_xmin else None
+    if not 0 <= after_id <= BIGINT_MAX:
+        raise ValueError(value)
+    if after_xmin is not None and not 0 <= after_xmin <= BIGINT_MAX:
+        raise ValueError(value)
+    return after_id, after_xmin
+
+
+class Subscription:
+    """One SSE client; ``None`` in the queue means the stream must end (client resumes)."""
+
+    def __init__(self, worker_id: int | None, maxsize: int):
+        self.worker_id = worker_id
+        self.queue: asyncio.Queue[dict | None] = asyncio.Queue(maxsize)
+        self.closed = False
+
+    def offer(self, event: dict) -> None:
+        if self.closed or (
+            self.worker_id is not None and self.worker_id not in (event["worker_id"], event["old_worker_id"])
+        ):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # slow consumer: drop it rather than buffer without bound; it resumes from its last ID
+            self.close()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class EventBroadcaster:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.notifications = 0
+        self.reconnects = 0
+        self._subscribers: set[Subscription] = set()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def subscribe(self, worker_id: int | None, timeout: float = 5.0) -> Subscription:
+        """Register a subscriber once LISTEN is active, so a replay started afterwards has no gap."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        subscription = Subscription(worker_id, self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close_all()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._ready.is_set(),
+            "subscribers": len(self._subscribers),
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
+
+    def _close_all(self) -> None:
+        for subscription in list(self._subscribers):
+            subscription.close()
+        self._subscribers.clear()
+
+    async def _run(self) -> None:
+        url = make_url(settings.events_database_url).set(drivername="postgresql")
+        dsn = url.render_as_string(hide_password=False)
+        while True:
+            pending: asyncio.Queue[str | None] = asyncio.Queue()
+            conn = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                conn.add_termination_listener(lambda _conn: pending.put_nowait(None))
+                await conn.add_listener(
+                    CHANNEL, lambda _conn, _pid, _channel, payload: pending.put_nowait(payload)
+                )
+                self._ready.set()
+                while (payload := await pending.get()) is not None:
+                    self.notifications += 1
+                    lo, hi, tx = (int(part) for part in payload.split(":"))
+                    for row in await conn.fetch(FETCH_NOTIFIED, lo, hi, tx):
+                        event = event_out(row)
+                        for subscription in list(self._subscribers):
+                            subscription.offer(event)
+            except Exception:
+                # anything (a bad payload included) restarts the listener instead of ending it
+                logger.exception("ticket event listener failed; reconnecting")
+            finally:
+                self._ready.clear()
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            # events may have been missed while disconnected: make clients resume from their last ID
+            self._close_all()
+            self.reconnects += 1
+            await asyncio.sleep(1)
+
+
+ticket_events = EventBroadcaster(settings.events_queue_size)
+
+
+async def replay(
+    db: AsyncSession, after_id: int, after_xmin: int | None, worker_id: int | None, limit: int
+) -> list[dict]:
+    resume = TicketEvent.id > after_id
+    if after_xmin is not None:
+        # events of transactions open at the cursor may have committed below after_id since
+        resume = or_(resume, TicketEvent.tx >= after_xmin)
+    query = (
+        select(
+            TicketEvent.id,
+            TicketEvent.ticket_id,
+            TicketEvent.kind,
+            TicketEvent.status,
+            TicketEvent.worker_id,
+            TicketEvent.old_worker_id,
+            TicketEvent.viewed,
+            TicketEvent.created_at,
+            literal_column(SNAPSHOT_XMIN).label("xmin"),
+        )
+        .where(resume)
+        .order_by(TicketEvent.id)
+        .limit(limit)
+    )
+    if worker_id is not None:
+        query = query.where(
+            or_(TicketEvent.worker_id == worker_id, TicketEvent.old_worker_id == worker_id)
+        )
+    return [event_out(row._mapping) for row in await db.execute(query)]
+
+
+async def prune(db: AsyncSession, older_than: timedelta, batch_size: int = 10000) -> int:
+    cutoff = datetime.now(timezone.utc) - older_than
+    removed = 0
+    while True:
+        batch = select(TicketEvent.id).where(TicketEvent.created_at < cutoff).limit(batch_size)
+        result = await db.execute(delete(TicketEvent).where(TicketEvent.id.in_(batch.scalar_subquery())))
+        await db.commit()
+        removed += result.rowcount
+        if result.rowcount < batch_size:
+            return removed
+
+
+async def _main(days: int) -> int:
+    async with AsyncSessionLocal() as db:
+        removed = await prune(db, timedelta(days=days))
+    print(f"removed {removed} ticket events older than {days} days")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the ticket_events change feed")
+    parser.add_argument("command", choices=["prune"])
+    parser.add_argument("--days", type=int, default=7, help="Keep events newer than this many days")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.days)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Postgres-backed background jobs with a transactional outbox.
+
+Request handlers enqueue side effects as rows of ``jobs`` in their own transaction (``enqueue``
+through the session, or ``enqueue_from`` as a CTE of the statement making the change), so a
+job exists exactly when its change committed. Workers claim due jobs with
+``FOR UPDATE SKIP LOCKED``, run the handler registered for the job's kind and delete the job
+in the handler's transaction. A failed job is retried after an exponential backoff
+(JOBS_BACKOFF_BASE_SECONDS doubling per attempt, capped at JOBS_BACKOFF_MAX_SECONDS) until
+it has used ``max_attempts``; then it stays in the table as ``dead``. A job still running
+after JOBS_LEASE_SECONDS (its worker died) counts as a failed attempt; handlers time out after
+JOBS_TIMEOUT_SECONDS, kept under the lease. Finishing or failing a job is fenced on the claim
+(worker and attempt), so a worker whose lease was reaped cannot touch the job's next run.
+
+Each API process runs a worker unless JOBS_WORKER_IN_PROCESS=false; standalone workers run
+with ``python -m app.jobs work``. Handlers must be idempotent: a worker dying between the
+handler's effect and its commit, or a webhook timing out after delivery, repeats the job.
+
+Usage: python -m app.jobs work [--concurrency N] | stats | retry-dead [--kind KIND]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from collections.abc import Awaitable, Callable
+
+import httpx
+from sqlalchemy import delete, func, insert, literal, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .core.config import settings
+from .db import AsyncSessionLocal
+from .metrics import JOB_DURATION, JOBS_PROCESSED
+from .models import Client, Job, Ticket, TicketStatus, User
+
+
+logger = logging.getLogger(__name__)
+
+USER_PURGE = "users.purge"
+TICKET_STATUS_CHANGED = "tickets.status_changed"
+
+Handler = Callable[[AsyncSession, dict], Awaitable[None]]
+handlers: dict[str, Handler] = {}
+
+CLAIM_SQL = text(
+    """
+    UPDATE jobs
+    SET status = 'running', locked_at = now(), locked_by = :worker, attempts = attempts + 1
+    WHERE id = (
+        SELECT id FROM jobs WHERE status = 'pending' AND run_at <= now()
+        ORDER BY run_at, id LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, kind, payload, attempts, max_attempts
+    """
+)
+# a lapsed lease is a failed attempt: retry right away, or dead-letter when out of attempts
+REAP_SQL = text(
+    """
+    UPDATE jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+        run_at = now(), locked_at = NULL, locked_by = NULL, last_error = 'lease expired'
+    WHERE status = 'running' AND locked_at < now() - make_interval(secs => :lease)
+    """
+)
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register ``fn(db, payload)`` as the handler for jobs of ``kind``."""
+
+    def register(fn: Handler) -> Handler:
+        handlers[kind] = fn
+        return fn
+
+    return register
+
+
+def enqueue(db: AsyncSession, kind: str, payload: dict, max_attempts: int | None = None) -> Job:
+    """Add a job to the session; it is written, and becomes visible to workers, on commit."""
+    job = Job(kind=kind, payload=payload)
+    if max_attempts is not None:
+        job.max_attempts = max_attempts
+    db.add(job)
+    return job
+
+
+def enqueue_from(kind: str, source, **fields):
+    """INSERT ... SELECT enqueuing one ``kind`` job per row of ``source`` (usually a DML CTE).
+
+    ``fields`` map payload keys to columns of ``source``. Attach the result to the statement
+    making the change with ``.add_cte(enqueue_from(...).cte("job"))``.
+    """
+    pairs = [part for key, column in fields.items() for part in (literal(key), column)]
+    return insert(Job).from_select(
+        ["kind", "payload"], select(literal(kind), func.jsonb_build_object(*pairs)).select_from(source)
+    )
+
+
+def handler_timeout() -> float:
+    """Handlers are cut off before their lease can lapse, so the reaper never takes a live job."""
+    return min(settings.jobs_timeout_seconds, settings.jobs_lease_seconds * 0.8)
+
+
+def backoff(attempts: int) -> float:
+    """Seconds before retry number ``attempts``: doubling, capped, with jitter."""
+    delay = settings.jobs_backoff_base_seconds * 2 ** (attempts - 1)
+    delay = min(settings.jobs_backoff_max_seconds, delay)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobWorker:
+    def __init__(self, concurrency: int, poll_seconds: float, name: str | None = None):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.done = 0
+        self.retried = 0
+        self.dead = 0
+        self.lost = 0
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._loop()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._reap_loop()))
+
+    async def stop(self) -> None:
+        # a job cut off here is retried once its lease lapses
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "running": any(not task.done() for task in self._tasks),
+            "concurrency": self.concurrency,
+            "done": self.done,
+            "retried": self.retried,
+            "dead": self.dead,
+            "lost": self.lost,
+        }
+
+    async def run_once(self) -> bool:
+        """Claim and run one due job; False when there was none."""
+        async with AsyncSessionLocal() as db:
+            job = (await db.execute(CLAIM_SQL, {"worker": self.name})).mappings().first()
+            await db.commit()
+        if job is None:
+            return False
+        await self._process(job)
+        return True
+
+    async def reap(self) -> int:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(REAP_SQL, {"lease": settings.jobs_lease_seconds})
+            await db.commit()
+        return result.rowcount
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                ran = await self.run_once()
+            except Exception:
+                logger.exception("running a job failed")
+                ran = False
+            if not ran:
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _reap_loop(self) -> None:
+        while True:
+            try:
+                if reaped := await self.reap():
+                    logger.warning("%d jobs exceeded their lease", reaped)
+            except Exception:
+                logger.exception("reaping expired jobs failed")
+            await asyncio.sleep(max(self.poll_seconds, settings.jobs_lease_seconds / 10))
+
+    def _owned(self, job) -> tuple:
+        # this claim still holds the job: not reaped and reclaimed (by anyone) since
+        return (
+            Job.id == job["id"],
+            Job.status == "running",
+            Job.locked_by == self.name,
+            Job.attempts == job["attempts"],
+        )
+
+    async def _process(self, job) -> None:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            try:
+                run = handlers.get(job["kind"])
+                if run is None:
+                    raise LookupError(f"no handler for job kind {job['kind']!r}")
+                await asyncio.wait_for(run(db, job["payload"]), handler_timeout())
+                result = await db.execute(delete(Job).where(*self._owned(job)))
+                if result.rowcount == 0:
+                    # lease lost: undo this run's uncommitted work, the new owner repeats it
+                    await db.rollback()
+                    self._lost(job)
+                    return
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                await self._fail(db, job, exc)
+                return
+            finally:
+                JOB_DURATION.observe(time.perf_counter() - started, job["kind"])
+        self.done += 1
+        JOBS_PROCESSED.inc(job["kind"], "done")
+
+    async def _fail(self, db: AsyncSession, job, exc: Exception) -> None:
+        error = f"{type(exc).__name__}: {exc}"
+        values = {"locked_at": None, "locked_by": None, "last_error": error[:2000]}
+        dead = job["attempts"] >= job["max_attempts"]
+        if dead:
+            values["status"] = "dead"
+        else:
+            values["status"] = "pending"
+            values["run_at"] = func.now() + func.make_interval(0, 0, 0, 0, 0, 0, backoff(job["attempts"]))
+        result = await db.execute(update(Job).where(*self._owned(job)).values(**values))
+        await db.commit()
+        if result.rowcount == 0:
+            self._lost(job)
+        elif dead:
+            self.dead += 1
+            JOBS_PROCESSED.inc(job["kind"], "dead")
+            logger.error(
+                "job %s (%s) is dead after %d attempts: %s", job["id"], job["kind"], job["attempts"], error
+            )
+        else:
+            self.retried += 1
+            JOBS_PROCESSED.inc(job["kind"], "retry")
+            logger.warning(
+                "job %s (%s) attempt %d failed: %s", job["id"], job["kind"], job["attempts"], error
+            )
+
+    def _lost(self, job) -> None:
+        self.lost += 1
+        JOBS_PROCESSED.inc(job["kind"], "lost")
+        logger.warning("job %s (%s) attempt %d lost its lease", job["id"], job["kind"], job["attempts"])
+
+
+job_worker = JobWorker(settings.jobs_concurrency, settings.jobs_poll_seconds)
+
+
+@handler(USER_PURGE)
+async def purge_user(db: AsyncSession, payload: dict) -> None:
+    """Unassign a disabled worker's tickets (back to ``new`` for admin review), then delete them."""
+    user_id = payload["user_id"]
+    batch_size = settings.user_purge_batch_size
+    while True:
+        batch = select(Ticket.id, Ticket.created_at).where(Ticket.worker_id == user_id).limit(batch_size)
+        result = await db.execute(
+            update(Ticket)
+            .where(tuple_(Ticket.id, Ticket.created_at).in_(batch))
+            .values(worker_id=None, status=TicketStatus.new)
+            .execution_options(synchronize_session=False)
+        )
+        # short transactions; a retry picks up where this one stopped
+        await db.commit()
+        if result.rowcount < batch_size:
+            break
+    await db.execute(delete(User).where(User.id == user_id, User.disabled_at.is_not(None)))
+
+
+@handler(TICKET_STATUS_CHANGED)
+async def notify_status_change(db: AsyncSession, payload: dict) -> None:
+    """Tell the ticket's client about a status change via CLIENT_NOTIFY_WEBHOOK_URL (or the log)."""
+    row = (
+        await db.execute(
+            select(Ticket.id, Ticket.title, Client.name, Client.email)
+            .join(Client, Client.id == Ticket.client_id)
+            .where(Ticket.id == payload["ticket_id"])
+        )
+    ).first()
+    if row is None:
+        return
+    message = {
+        "ticket_id": row.id,
+        "title": row.title,
+        "status": payload["status"],
+        "client": {"name": row.name, "email": row.email},
+    }
+    if not settings.client_notify_webhook_url:
+        logger.info("status notification (no CLIENT_NOTIFY_WEBHOOK_URL): %s", message)
+        return
+    async with httpx.AsyncClient(timeout=settings.client_notify_timeout_seconds) as client:
+        response = await client.post(settings.client_notify_webhook_url, json=message)
+        response.raise_for_status()
+
+
+async def _stats() -> None:
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(
+            select(Job.kind, Job.status, func.count(), func.min(Job.run_at))
+            .group_by(Job.kind, Job.status)
+            .order_by(Job.kind, Job.status)
+        )
+        for kind, status, count, oldest in rows:
+            print(f"{kind:30} {status:8} {count:>10} oldest run_at {oldest:%Y-%m-%d %H:%M:%S}")
+
+
+async def _retry_dead(kind: str | None) -> None:
+    query = update(Job).where(Job.status == "dead").values(
+        status="pending", attempts=0, run_at=func.now(), last_error=None
+    )
+    if kind:
+        query = query.where(Job.kind == kind)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(query)
+        await db.commit()
+    print(f"requeued {result.rowcount} dead jobs")
+
+
+async def _work(concurrency: int) -> None:
+    worker = JobWorker(concurrency, settings.jobs_poll_seconds)
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run or inspect the background job queue")
+    parser.add_argument("command", choices=["work", "stats", "retry-dead"])
+    parser.add_argument("--concurrency", type=int, default=settings.jobs_concurrency)
+    parser.add_argument("--kind", help="Only requeue dead jobs of this kind (retry-dead)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.command == "work":
+        asyncio.run(_work(args.concurrency))
+    elif args.command == "stats":
+        asyncio.run(_stats())
+    else:
+        asyncio.run(_retry_dead(args.kind))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, public, users, tickets
+from .routers import admin_seed, auth, public, users, tickets
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from .db import AsyncSessionLocal
+from .budgets import QueryBudgetMiddleware
+from .core.config import settings
+from .db import AsyncSessionLocal, ReadYourWritesMiddleware, pool_stats, replica_pool_stats
+from .events import ticket_events
+from .jobs import job_worker
+from .metrics import CONTENT_TYPE, DB_POOL, MetricsMiddleware, registry
 from .models import User, UserRole
-from .security import hash_password
+from .partitions import maintain as maintain_partitions
+from .security import hash_password, password_hasher, principal_cache
+import asyncio
 import os
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
@@ -23,22 +30,46 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(ReadYourWritesMiddleware)
+    # added last = outermost: MetricsMiddleware starts the per-request statement count
+    app.add_middleware(QueryBudgetMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
     @app.get("/healthz")
     async def healthz():
-        return {"status": "ok"}
+        return {
+            "status": "ok",
+            "principal_cache": principal_cache.stats(),
+            "password_hasher": password_hasher.stats(),
+            "ticket_events": ticket_events.stats(),
+            "jobs": job_worker.stats(),
+            "db_pool": pool_stats(),
+            "db_replica_pools": replica_pool_stats(),
+        }
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        pools = {"primary": pool_stats()}
+        pools.update((f"replica{i}", stats) for i, stats in enumerate(replica_pool_stats()))
+        for name, stats in pools.items():
+            for state in ("checked_out", "idle", "overflow"):
+                DB_POOL.set(stats[state], name, state)
+        return Response(registry.render(), media_type=CONTENT_TYPE)
 
     app.include_router(auth.router)
     app.include_router(public.router)
     app.include_router(users.router)
     app.include_router(tickets.router)
-    # seed/admin routes removed for production cleanliness
+    # seed/admin routes stay out of production unless explicitly enabled
+    if settings.admin_seed_enabled:
+        app.include_router(admin_seed.router)
 
     @app.exception_handler(StarletteHTTPException)
     async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         return JSONResponse(
             status_code=exc.status_code,
             content={"error": exc.detail or exc.__class__.__name__, "status": exc.status_code},
+            headers=getattr(exc, "headers", None),
         )
 
     @app.exception_handler(RequestValidationError)
@@ -59,6 +90,15 @@ def create_app() -> FastAPI:
             content={"error": "Internal Server Error", "status": 500},
         )
 
+    @app.on_event("startup")
+    async def start_partition_maintenance():
+        app.state.partition_maintenance = asyncio.create_task(maintain_partitions())
+
+    @app.on_event("startup")
+    async def start_job_worker():
+        if settings.jobs_worker_in_process:
+            job_worker.start()
+
     @app.on_event("startup")
     async def seed_default_users():
         # Optional seeding via env vars; idempotent
@@ -73,7 +113,7 @@ def create_app() -> FastAPI:
                     db.add(
                         User(
                             username=admin_username,
-                            password_hash=hash_password(admin_password),
+                            password_hash=await hash_password(admin_password),
                             role=UserRole.admin,
                         )
                     )
@@ -84,12 +124,28 @@ def create_app() -> FastAPI:
                     db.add(
                         User(
                             username=worker_username,
-                            password_hash=hash_password(worker_password),
+                            password_hash=await hash_password(worker_password),
                             role=UserRole.worker,
                         )
                     )
                     await db.commit()
 
+    @app.on_event("shutdown")
+    async def stop_ticket_events():
+        await ticket_events.stop()
+
+    @app.on_event("shutdown")
+    async def stop_partition_maintenance():
+        app.state.partition_maintenance.cancel()
+        try:
+            await app.state.partition_maintenance
+        except asyncio.CancelledError:
+            pass
+
+    @app.on_event("shutdown")
+    async def stop_job_worker():
+        await job_worker.stop()
+
     return app
 
 
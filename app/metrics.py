@@ -0,0 +1,281 @@
+"""In-process Prometheus metrics: a small text-format registry, HTTP middleware and DB hooks.
+
+Everything is updated on the event loop thread, so plain counters need no locking. Served by
+``GET /metrics`` in the text exposition format (version 0.0.4).
+"""
+
+import collections
+import functools
+import re
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_SPACE = re.compile(r"\s+")
+# expanded IN lists (``?::VARCHAR, ?::VARCHAR, ...``) and multi-row VALUES
+_PARAM_LIST = re.compile(r"\?((?:::[\w\[\] ]+?)?)(?:, \?\1)+(?=\))")
+_ROW_LIST = re.compile(r"(\([^()]*\))(?:, \1)+")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+
+    def _key(self, labels: tuple) -> tuple:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(v) for v in labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # per label set: [bucket counts..., sum, count]
+        self._series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                le = _labels(self.label_names, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            inf = _labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route and status code.",
+        ("method", "route", "status"),
+    )
+)
+HTTP_LATENCY = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route.",
+        ("method", "route"),
+    )
+)
+HTTP_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "HTTP requests being served."))
+DB_STATEMENTS = registry.register(
+    Histogram(
+        "db_statements_per_request",
+        "SQL statements executed per HTTP request.",
+        ("method", "route"),
+        buckets=COUNT_BUCKETS,
+    )
+)
+DB_REQUEST_TIME = registry.register(
+    Histogram(
+        "db_time_per_request_seconds",
+        "Time spent in SQL per HTTP request.",
+        ("method", "route"),
+    )
+)
+DB_STATEMENT_TIME = registry.register(
+    Histogram("db_statement_duration_seconds", "Duration of single SQL statements.")
+)
+DB_POOL = registry.register(
+    Gauge("db_pool_connections", "Pooled connections by engine and state.", ("engine", "state"))
+)
+PASSWORD_HASH_TIME = registry.register(
+    Histogram(
+        "password_hash_duration_seconds",
+        "bcrypt time in the worker thread.",
+        ("operation",),
+    )
+)
+PASSWORD_HASH_QUEUE_TIME = registry.register(
+    Histogram(
+        "password_hash_queue_seconds",
+        "Wait for a free bcrypt worker thread.",
+        ("operation",),
+    )
+)
+PASSWORD_HASH_REJECTED = registry.register(
+    Counter(
+        "password_hash_rejected_total",
+        "bcrypt calls refused with 503 (queue full).",
+        ("operation",),
+    )
+)
+JOBS_PROCESSED = registry.register(
+    Counter(
+        "jobs_processed_total",
+        "Background job attempts by kind and outcome (done, retry, dead, lost).",
+        ("kind", "outcome"),
+    )
+)
+JOB_DURATION = registry.register(
+    Histogram("job_duration_seconds", "Background job handler time by kind.", ("kind",))
+)
+
+@functools.lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    """Statement text with bind parameters as ``?`` and IN lists / VALUES rows folded."""
+    shape = _SPACE.sub(" ", _PARAM.sub("?", statement)).strip()
+    shape = _PARAM_LIST.sub(r"?\1, ...", shape)
+    return _ROW_LIST.sub(r"\1, ...", shape)
+
+
+class RequestDbStats:
+    """SQL statements run on behalf of the current request."""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        # statement shape -> executions (shapes, not raw text: compiled statements repeat, so
+        # the cached shape is cheap and a request holds one entry per distinct query)
+        self.shapes: collections.Counter[str] = collections.Counter()
+        self.budget: int | None = None
+
+
+request_db_stats: ContextVar[RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on ``engine`` and charge it to the current request, if any."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        DB_STATEMENT_TIME.observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+            stats.shapes[statement_shape(statement)] += 1
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB usage per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        stats = RequestDbStats()
+        token = request_db_stats.set(stats)
+        start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            request_db_stats.reset(token)
+            # route templates keep label cardinality bounded; unknown paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, status_code)
+            HTTP_LATENCY.observe(time.perf_counter() - start, method, route)
+            DB_STATEMENTS.observe(stats.statements, method, route)
+            DB_REQUEST_TIME.observe(stats.seconds, method, route)
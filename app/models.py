@@ -1,7 +1,24 @@
 import enum
+import hashlib
 from datetime import datetime
 
-from sqlalchemy import String, Text, Enum, ForeignKey, DateTime, Boolean, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Computed,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Identity,
+    Index,
+    Sequence,
+    SmallInteger,
+    String,
+    Text,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -20,6 +37,8 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(String(255))
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # set by DELETE /users/{id}; the row itself goes once a users.purge job has unassigned its tickets
+    disabled_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     tickets: Mapped[list["Ticket"]] = relationship(back_populates="worker")
 
@@ -29,12 +48,16 @@ class Client(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100))
-    email: Mapped[str] = mapped_column(String(200), index=True)
+    email: Mapped[str] = mapped_column(String(200))
+    # identity of a client: one row per normalized email, upserted on ticket creation
+    email_key: Mapped[str] = mapped_column(String(200), Computed("lower(btrim(email))", persisted=True))
     phone: Mapped[str | None] = mapped_column(String(50), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     tickets: Mapped[list["Ticket"]] = relationship(back_populates="client")
 
+    __table_args__ = (Index("uq_clients_email_key", "email_key", unique=True),)
+
 
 class TicketStatus(str, enum.Enum):
     new = "new"
@@ -42,19 +65,46 @@ class TicketStatus(str, enum.Enum):
     done = "done"
 
 
+# nextval() source for inserts that claim a ticket_content_keys row before the ticket exists
+TICKET_ID_SEQ = Sequence("tickets_id_seq")
+
+
 class Ticket(Base):
+    """Range-partitioned by month of ``created_at``; see app.partitions.
+
+    The key is (id, created_at) because every unique index must contain the partition key;
+    ``id`` alone is still unique (one sequence) and content_hash uniqueness lives in
+    ``ticket_content_keys``.
+    """
+
     __tablename__ = "tickets"
     __table_args__ = (
-        UniqueConstraint("title", "description", "client_id", name="uq_ticket_client_content"),
+        # keyset pagination: one index per filter combination of list_tickets
+        Index("ix_tickets_created_at_id", "created_at", "id"),
+        Index("ix_tickets_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_tickets_worker_created_at_id", "worker_id", "created_at", "id"),
+        Index("ix_tickets_worker_status_created_at_id", "worker_id", "status", "created_at", "id"),
+        # search: full-text over title+description, trigram for substrings and typos
+        Index("ix_tickets_search_vector", "search_vector", postgresql_using="gin"),
+        # archival candidates (app.archive)
+        Index("ix_tickets_done_at", "done_at", postgresql_where=text("status = 'done'")),
+        Index("ix_tickets_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index(
+            "ix_tickets_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    title: Mapped[str] = mapped_column(String(200), index=True)
+    title: Mapped[str] = mapped_column(String(200))
     description: Mapped[str] = mapped_column(Text)
-    status: Mapped[TicketStatus] = mapped_column(Enum(TicketStatus), default=TicketStatus.new, index=True)
+    status: Mapped[TicketStatus] = mapped_column(Enum(TicketStatus), default=TicketStatus.new)
     client_id: Mapped[int] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"))
     worker_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     viewed: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
     assigned_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -62,8 +112,174 @@ class Ticket(Base):
     done_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     requester_ip: Mapped[str | None] = mapped_column(String(64), nullable=True)
     requester_ua: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    # see ticket_content_hash; NULL only for legacy rows that collided during the backfill
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True),
+        deferred=True,
+    )
 
     client: Mapped[Client] = relationship(back_populates="tickets")
     worker: Mapped[User | None] = relationship(back_populates="tickets")
 
 
+class TicketArchive(Base):
+    """Done tickets moved out of ``tickets`` by app.archive; same columns plus ``archived_at``.
+
+    Read-only for the API: lists and exports union it in on ``include_archived=true``.
+    """
+
+    __tablename__ = "tickets_archive"
+    __table_args__ = (
+        Index("ix_tickets_archive_created_at_id", "created_at", "id"),
+        Index("ix_tickets_archive_worker_created_at_id", "worker_id", "created_at", "id"),
+        Index("ix_tickets_archive_client_id", "client_id"),
+        Index("ix_tickets_archive_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_tickets_archive_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_tickets_archive_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    title: Mapped[str] = mapped_column(String(200))
+    description: Mapped[str] = mapped_column(Text)
+    status: Mapped[TicketStatus] = mapped_column(Enum(TicketStatus))
+    client_id: Mapped[int] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"))
+    worker_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    viewed: Mapped[bool] = mapped_column(Boolean)
+    assigned_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    in_progress_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    done_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    requester_ip: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    requester_ua: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True),
+        deferred=True,
+    )
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.split()).lower()
+
+
+def ticket_content_hash(title: str, description: str, email: str) -> str:
+    """Duplicate-detection key over whitespace-collapsed, lowercased title, description and email.
+
+    The 0007 backfill uses a copy of this, so keep the two in sync.
+    """
+    raw = "\x1f".join(_normalize(part) for part in (title, description, email))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class TicketContentKey(Base):
+    """Claimed content hash per ticket: the duplicate check the partitioned ``tickets`` cannot hold.
+
+    Inserts claim the hash here first (ON CONFLICT DO NOTHING) and only then write the ticket;
+    a statement trigger on ``tickets`` deletes the key along with its ticket.
+    """
+
+    __tablename__ = "ticket_content_keys"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    ticket_id: Mapped[int] = mapped_column()
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+
+class TicketCounter(Base):
+    """Rollup of ticket counts maintained by statement triggers on ``tickets`` and ``tickets_archive``.
+
+    ``worker_id`` 0 stands for unassigned; ``archived`` tells which table the rows count; each
+    key is striped over ``shard`` rows so readers must sum.
+    """
+
+    __tablename__ = "ticket_counters"
+
+    worker_id: Mapped[int] = mapped_column(primary_key=True)
+    status: Mapped[TicketStatus] = mapped_column(Enum(TicketStatus), primary_key=True)
+    archived: Mapped[bool] = mapped_column(Boolean, primary_key=True, default=False)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class TicketEvent(Base):
+    """Change feed row written by statement triggers on ``tickets`` (created/assigned/status/viewed).
+
+    ``tx`` is the writing transaction id, used with the NOTIFY payload to read back one
+    statement's events and to resume feeds across out-of-order commits. ``old_worker_id`` is
+    the worker before an update, so a reassignment reaches the previous worker's feed too.
+    """
+
+    __tablename__ = "ticket_events"
+    __table_args__ = (
+        Index("ix_ticket_events_worker_id_id", "worker_id", "id"),
+        Index("ix_ticket_events_old_worker_id_id", "old_worker_id", "id"),
+        Index("ix_ticket_events_tx", "tx"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    ticket_id: Mapped[int] = mapped_column()
+    kind: Mapped[str] = mapped_column(String(20))
+    status: Mapped[TicketStatus] = mapped_column(Enum(TicketStatus))
+    worker_id: Mapped[int | None] = mapped_column(nullable=True)
+    old_worker_id: Mapped[int | None] = mapped_column(nullable=True)
+    viewed: Mapped[bool] = mapped_column(Boolean)
+    tx: Mapped[int] = mapped_column(BigInteger, server_default=func.txid_current())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class TableVersion(Base):
+    """Change counter per table, bumped by a statement trigger on every write.
+
+    Striped over ``shard`` rows like ``ticket_counters``; the table's version is the sum.
+    """
+
+    __tablename__ = "table_versions"
+
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    shard: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    modified_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class Job(Base):
+    """Background job / transactional outbox row; see app.jobs.
+
+    Enqueued in the transaction of the change that causes it, claimed by workers with
+    ``FOR UPDATE SKIP LOCKED`` and deleted once its handler commits. Failures retry with
+    backoff until ``max_attempts``, then stay as ``dead``.
+    """
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_pending_run_at", "run_at", "id", postgresql_where=text("status = 'pending'")),
+        Index("ix_jobs_running_locked_at", "locked_at", postgresql_where=text("status = 'running'")),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50))
+    payload: Mapped[dict] = mapped_column(JSONB, server_default=text("'{}'::jsonb"))
+    status: Mapped[str] = mapped_column(String(10), server_default="pending")
+    attempts: Mapped[int] = mapped_column(server_default="0")
+    max_attempts: Mapped[int] = mapped_column(server_default="5")
+    run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    locked_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    locked_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,90 @@
+"""Monthly partitions of ``tickets``.
+
+Tickets are range-partitioned by ``created_at`` on UTC month boundaries (migration 0011).
+Everything from before the migration lives in ``tickets_legacy`` (MINVALUE up to the month
+after the upgrade); each later month gets a ``tickets_YYYY_MM`` partition. The
+``ticket_partitions_ensure`` SQL function creates the missing ones through the current month
+plus TICKET_PARTITIONS_AHEAD; the API runs it at startup and every
+TICKET_PARTITIONS_CHECK_HOURS, and it can be run by hand or from cron as well.
+
+Usage: python -m app.partitions ensure [--months N] | list
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .core.config import settings
+from .db import AsyncSessionLocal
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 60
+
+LIST_SQL = """
+SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bounds,
+       c.reltuples::bigint AS estimated_rows, pg_total_relation_size(c.oid) AS total_bytes
+FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'tickets'::regclass
+ORDER BY c.relname
+"""
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int | None = None) -> int:
+    """Create missing monthly partitions; returns how many were created."""
+    months = settings.ticket_partitions_ahead if months_ahead is None else months_ahead
+    created = (
+        await db.execute(text("SELECT ticket_partitions_ensure(:months)"), {"months": months})
+    ).scalar_one()
+    await db.commit()
+    return created
+
+
+async def list_partitions(db: AsyncSession) -> list[dict]:
+    return [dict(row._mapping) for row in await db.execute(text(LIST_SQL))]
+
+
+async def maintain() -> None:
+    """Background task: keep partitions ahead of the calendar while the API runs."""
+    while True:
+        delay = settings.ticket_partitions_check_hours * 3600
+        try:
+            async with AsyncSessionLocal() as db:
+                created = await ensure_partitions(db)
+            if created:
+                logger.info("created %d ticket partitions", created)
+        except Exception:
+            # e.g. the database unreachable at startup: keep the task alive and retry soon
+            logger.exception("ticket partition maintenance failed")
+            delay = min(delay, RETRY_SECONDS)
+        await asyncio.sleep(delay)
+
+
+async def _main(args: argparse.Namespace) -> int:
+    async with AsyncSessionLocal() as db:
+        if args.command == "ensure":
+            created = await ensure_partitions(db, args.months)
+            print(f"created {created} ticket partitions")
+            return 0
+        for row in await list_partitions(db):
+            print(
+                f"{row['name']:20} {row['bounds']:75} "
+                f"~{row['estimated_rows']:>12,} rows {row['total_bytes'] / 2**20:>10.1f} MiB"
+            )
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the monthly partitions of tickets")
+    parser.add_argument("command", choices=["ensure", "list"])
+    parser.add_argument("--months", type=int, help="Months ahead of the current one (ensure)")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import random
-from fastapi import APIRouter, Depends
+import secrets
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 
+from ..core.config import settings
+from ..datagen import generate
 from ..db import get_db
 from ..models import User, UserRole, Client, Ticket, TicketStatus
-from ..security import get_current_user, require_role, hash_password
+from ..security import get_current_user, require_role, hash_password, principal_cache
 
 
 router = APIRouter(prefix="/admin/seed", tags=["admin-seed"])
@@ -17,8 +20,24 @@ async def seed_disabled():
 
 
 @router.post("/faker")
-async def faker_disabled():
-    return {"detail": "disabled"}
+async def faker(
+    tickets: int = Query(1000, ge=1, le=settings.datagen_api_max_tickets),
+    clients: int | None = Query(None, ge=1, le=settings.datagen_api_max_tickets),
+    workers: int = Query(0, ge=0, le=50, description="New workers to create; 0 uses existing"),
+    days: int = Query(90, ge=1, le=3650, description="Spread tickets over this many days"),
+    current_user: User = Depends(get_current_user),
+):
+    """Generate synthetic data with app.datagen (COPY); the CLI has no size limit."""
+    await require_role(current_user, (UserRole.admin,))
+    # generated workers get an unknown password; set one with PUT /users/{id} to log in
+    return await generate(
+        tickets=tickets,
+        clients=clients,
+        workers=workers,
+        days=days,
+        chunk_size=5000,
+        password=secrets.token_urlsafe(16),
+    )
 
 
 @router.post("/reset_and_seed")
@@ -37,6 +56,8 @@ async def reset_all(
     # delete workers only (keep admins)
     await db.execute(delete(User).where(User.role == UserRole.worker))
     await db.commit()
+    # deleted workers' tokens must stop resolving right away, not after the cache TTL
+    principal_cache.clear()
     return {"status": "ok"}
 
 
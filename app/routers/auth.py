@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..budgets import query_budget
 from ..db import get_db
 from ..models import User
 from ..schemas import LoginIn, TokenOut, UserOut
@@ -16,17 +17,17 @@ from ..security import require_role
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/login", response_model=TokenOut, status_code=200)
+@router.post("/login", response_model=TokenOut, status_code=200, dependencies=[query_budget(1)])
 async def login(payload: LoginIn, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.username == payload.username))
+    result = await db.execute(select(User).where(User.username == payload.username, User.disabled_at.is_(None)))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.password_hash):
+    if not user or not await verify_password(payload.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     token = create_access_token({"sub": user.username, "role": user.role})
     return TokenOut(access_token=token)
 
 
-@router.get("/me", response_model=UserOut)
+@router.get("/me", response_model=UserOut, dependencies=[query_budget(1)])
 async def me(current_user: User = Depends(get_current_user)):
     return UserOut(id=current_user.id, username=current_user.username, role=current_user.role, created_at=current_user.created_at)
 
@@ -54,7 +55,7 @@ async def exchange_view_token(
     raise HTTPException(status_code=404, detail="disabled")
 
 
-@router.post("/request_view_token", response_model=TokenOut)
+@router.post("/request_view_token", response_model=TokenOut, dependencies=[query_budget(1)])
 async def request_view_token(current_user: User = Depends(get_current_user)):
     # only admins can mint a short-lived view token
     await require_role(current_user, (UserRole.admin,))
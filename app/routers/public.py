@@ -1,59 +1,386 @@
+import json
+from typing import AsyncIterator
+
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, join
+from sqlalchemy import Integer, String, column, false, func, insert, literal, select, true, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
 
+from ..budgets import query_budget, raise_budget
+from ..core.config import settings
 from ..db import get_db
 from fastapi import Request
-from ..models import Client, Ticket, TicketStatus
-from ..schemas import TicketCreatePublic, TicketOut, ClientOut, UserOut
+from ..models import (
+    TICKET_ID_SEQ,
+    Client,
+    Ticket,
+    TicketContentKey,
+    TicketStatus,
+    ticket_content_hash,
+)
+from ..schemas import TicketBatchOut, TicketBatchResult, TicketCreatePublic, TicketOut, ticket_out
 
 
 router = APIRouter(prefix="/public", tags=["public"])
 
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+# claim the hashes, upsert the clients, insert the tickets
+CHUNK_STATEMENTS = 3
+
 
-@router.post("/tickets", response_model=TicketOut, status_code=201)
+@router.post("/tickets", response_model=TicketOut, status_code=201, dependencies=[query_budget(1)])
 async def create_ticket(payload: TicketCreatePublic, request: Request, db: AsyncSession = Depends(get_db)):
-    # prevent exact duplicates by title, description, and client email
-    dup_q = (
-        select(Ticket.id)
-        .select_from(join(Ticket, Client, Ticket.client_id == Client.id))
-        .where(
-            Ticket.title == payload.title,
-            Ticket.description == payload.description,
-            Client.email == payload.client.email,
+    # one statement: claim the content hash, then upsert client by email + insert the ticket under
+    # the claimed id; an already claimed hash leaves every step empty and means duplicate
+    content_hash = ticket_content_hash(payload.title, payload.description, payload.client.email)
+    claim = (
+        pg_insert(TicketContentKey)
+        .values(content_hash=content_hash, ticket_id=TICKET_ID_SEQ.next_value(), created_at=func.now())
+        .on_conflict_do_nothing(index_elements=[TicketContentKey.content_hash])
+        .returning(TicketContentKey.ticket_id)
+        .cte("claim")
+    )
+    client_upsert = pg_insert(Client).from_select(
+        ["name", "email", "phone", "created_at"],
+        select(
+            literal(payload.client.name),
+            literal(payload.client.email),
+            literal(payload.client.phone, String),
+            func.now(),
+        ).select_from(claim),
+        include_defaults=False,
+    )
+    new_client = (
+        client_upsert.on_conflict_do_update(
+            index_elements=[Client.email_key],
+            set_={
+                "name": client_upsert.excluded.name,
+                "phone": func.coalesce(client_upsert.excluded.phone, Client.phone),
+            },
+        )
+        .returning(*Client.__table__.c)
+        .cte("new_client")
+    )
+    new_ticket = (
+        pg_insert(Ticket)
+        .from_select(
+            [
+                "id",
+                "title",
+                "description",
+                "status",
+                "viewed",
+                "client_id",
+                "created_at",
+                "updated_at",
+                "requester_ip",
+                "requester_ua",
+                "content_hash",
+            ],
+            select(
+                claim.c.ticket_id,
+                literal(payload.title),
+                literal(payload.description),
+                literal(TicketStatus.new, Ticket.status.type),
+                false(),
+                new_client.c.id,
+                func.now(),
+                func.now(),
+                literal(request.client.host if request.client else None, String),
+                literal(request.headers.get("user-agent"), String),
+                literal(content_hash),
+            ).join_from(claim, new_client, true()),
+            include_defaults=False,
         )
-        .limit(1)
+        .returning(*Ticket.__table__.c)
+        .cte("new_ticket")
     )
-    if (await db.execute(dup_q)).scalar_one_or_none():
+    ticket_alias = aliased(Ticket, new_ticket)
+    client_alias = aliased(Client, new_client)
+    row = (
+        await db.execute(
+            select(ticket_alias, client_alias).join(client_alias, client_alias.id == ticket_alias.client_id)
+        )
+    ).first()
+    if not row:
         raise HTTPException(status_code=409, detail="Duplicate ticket detected")
-    client = Client(name=payload.client.name, email=payload.client.email, phone=payload.client.phone)
-    ticket = Ticket(
-        title=payload.title,
-        description=payload.description,
-        status=TicketStatus.new,
-        requester_ip=request.client.host if request.client else None,
-        requester_ua=request.headers.get("user-agent"),
-    )
-    ticket.client = client
-    db.add_all([client, ticket])
     await db.commit()
-    await db.refresh(ticket)
-    await db.refresh(client)
-
-    return TicketOut(
-        id=ticket.id,
-        title=ticket.title,
-        description=ticket.description,
-        status=ticket.status,
-        client=ClientOut(id=client.id, name=client.name, email=client.email, phone=client.phone, created_at=client.created_at),
-        worker=None,
-        created_at=ticket.created_at,
-        updated_at=ticket.updated_at,
-        assigned_at=ticket.assigned_at,
-        in_progress_at=ticket.in_progress_at,
-        done_at=ticket.done_at,
-        requester_ip=ticket.requester_ip,
-        requester_ua=ticket.requester_ua,
+    ticket, client = row
+    return ticket_out(ticket, client, None)
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+async def _limited_stream(request: Request) -> AsyncIterator[bytes]:
+    """The request body as it arrives, cut off with 413 past PUBLIC_BATCH_MAX_BYTES."""
+    limit = settings.public_batch_max_bytes
+    detail = f"Batch body exceeds {limit} bytes"
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        raise _too_large(detail)
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise _too_large(detail)
+        yield chunk
+
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    max_line = settings.public_batch_max_line_bytes
+    buffer = bytearray()
+    async for chunk in _limited_stream(request):
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) >= 0:
+            if end - start > max_line:
+                raise _too_large(f"NDJSON line exceeds {max_line} bytes")
+            line = bytes(buffer[start:end])
+            if line.strip():
+                yield line
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line:
+            raise _too_large(f"NDJSON line exceeds {max_line} bytes")
+    if buffer.strip():
+        yield bytes(buffer)
+
+
+async def _iter_records(request: Request) -> AsyncIterator[bytes | object]:
+    """Yield raw NDJSON lines as they arrive, or the items of a JSON array body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        records = _ndjson_lines(request)
+    else:
+        body = bytearray()
+        async for chunk in _limited_stream(request):
+            body += chunk
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        # the whole array is in hand: refuse it before anything is inserted
+        if len(items) > settings.public_batch_max_records:
+            raise _too_large(f"At most {settings.public_batch_max_records} records per batch")
+        records = _alist(items)
+    count = 0
+    async for record in records:
+        count += 1
+        # NDJSON: stop reading at the first record over the limit
+        if count > settings.public_batch_max_records:
+            raise _too_large(f"At most {settings.public_batch_max_records} records per batch")
+        yield record
+
+
+async def _alist(items: list):
+    for item in items:
+        yield item
+
+
+def _dedup_key(payload: TicketCreatePublic) -> str:
+    return ticket_content_hash(payload.title, payload.description, payload.client.email)
+
+
+async def _insert_chunk(
+    db: AsyncSession,
+    chunk: list[tuple[int, TicketCreatePublic, str]],
+    requester_ip: str | None,
+    requester_ua: str | None,
+) -> list[TicketBatchResult]:
+    """Insert one bounded chunk (already deduplicated within the batch) in its own transaction."""
+    # claiming the hashes first settles duplicates, stored or racing, before anything is written
+    claimed = dict(
+        (
+            await db.execute(
+                pg_insert(TicketContentKey)
+                .values(
+                    [
+                        {
+                            "content_hash": content_hash,
+                            "ticket_id": TICKET_ID_SEQ.next_value(),
+                            "created_at": func.now(),
+                        }
+                        for _, _, content_hash in chunk
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[TicketContentKey.content_hash])
+                .returning(TicketContentKey.content_hash, TicketContentKey.ticket_id)
+            )
+        ).all()
     )
+    results = [
+        TicketBatchResult(index=index, result="duplicate")
+        for index, _, content_hash in chunk
+        if content_hash not in claimed
+    ]
+    fresh = [record for record in chunk if record[2] in claimed]
+    if not fresh:
+        await db.commit()
+        return results
+
+    # Emails are normalized by Postgres only (Python's strip/lower differ on some Unicode): one
+    # upsert row per email_key (the last record wins name/phone), so no row is hit twice, and
+    # ids come back keyed by the submitted email strings.
+    clients = {p.client.email: (order, p.client) for order, (_, p, _) in enumerate(fresh)}
+    submitted = (
+        select(
+            values(
+                column("ord", Integer), column("name", String), column("email", String), column("phone", String),
+                name="submitted",
+            ).data([(order, c.name, email, c.phone) for email, (order, c) in clients.items()])
+        )
+        .cte("submitted")
+    )
+    submitted_key = func.lower(func.btrim(submitted.c.email))
+    client_upsert = pg_insert(Client).from_select(
+        ["name", "email", "phone"],
+        select(submitted.c.name, submitted.c.email, submitted.c.phone)
+        .distinct(submitted_key)
+        .order_by(submitted_key, submitted.c.ord.desc()),
+    )
+    upserted = (
+        client_upsert.on_conflict_do_update(
+            index_elements=[Client.email_key],
+            set_={
+                "name": client_upsert.excluded.name,
+                "phone": func.coalesce(client_upsert.excluded.phone, Client.phone),
+            },
+        )
+        .returning(Client.email_key, Client.id)
+        .cte("upserted")
+    )
+    client_ids = dict(
+        (
+            await db.execute(
+                select(submitted.c.email, upserted.c.id).join(
+                    upserted, upserted.c.email_key == submitted_key
+                )
+            )
+        ).all()
+    )
+    await db.execute(
+        insert(Ticket),
+        [
+            {
+                "id": claimed[content_hash],
+                "title": p.title,
+                "description": p.description,
+                "status": TicketStatus.new,
+                "client_id": client_ids[p.client.email],
+                "requester_ip": requester_ip,
+                "requester_ua": requester_ua,
+                "content_hash": content_hash,
+            }
+            for _, p, content_hash in fresh
+        ],
+    )
+    await db.commit()
+    results.extend(
+        TicketBatchResult(index=index, result="created", id=claimed[content_hash])
+        for index, _, content_hash in fresh
+    )
+    return results
 
 
+@router.post(
+    "/tickets/batch",
+    response_model=TicketBatchOut,
+    status_code=200,
+    dependencies=[query_budget(CHUNK_STATEMENTS)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/TicketCreatePublic"}}
+                },
+                "application/x-ndjson": {
+                    "schema": {"type": "string", "description": "One TicketCreatePublic object per line"}
+                },
+            },
+        }
+    },
+)
+async def create_tickets_batch(request: Request, db: AsyncSession = Depends(get_db)):
+    """Ingest many public tickets; duplicates (in the batch or already stored) are reported, not failed.
+
+    Chunks commit as they fill, so a size limit hit mid-stream (NDJSON) does not fail the
+    request once records have been read: the records before it are still inserted and the
+    response carries their results with ``truncated`` set to the reason.
+    """
+    requester_ip = request.client.host if request.client else None
+    requester_ua = request.headers.get("user-agent")
+    results: list[TicketBatchResult] = []
+    seen: set[str] = set()
+    chunk: list[tuple[int, TicketCreatePublic, str]] = []
+    chunks = 0
+    truncated = None
+
+    async def flush() -> None:
+        nonlocal chunk, chunks
+        if chunks:
+            raise_budget(CHUNK_STATEMENTS)
+        chunks += 1
+        results.extend(await _insert_chunk(db, chunk, requester_ip, requester_ua))
+        chunk = []
+
+    index = -1
+    records = _aenumerate(_iter_records(request))
+    while True:
+        try:
+            index, raw = await anext(records)
+        except StopAsyncIteration:
+            break
+        except HTTPException as exc:
+            if exc.status_code != 413 or index < 0:
+                raise
+            truncated = exc.detail
+            break
+        try:
+            if isinstance(raw, bytes):
+                payload = TicketCreatePublic.model_validate_json(raw)
+            else:
+                payload = TicketCreatePublic.model_validate(raw)
+        except ValidationError as exc:
+            results.append(TicketBatchResult(index=index, result="invalid", error=_describe(exc)))
+            continue
+        key = _dedup_key(payload)
+        if key in seen:
+            results.append(TicketBatchResult(index=index, result="duplicate"))
+            continue
+        seen.add(key)
+        chunk.append((index, payload, key))
+        if len(chunk) >= settings.public_batch_chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+    if index < 0:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+
+    results.sort(key=lambda r: r.index)
+    return TicketBatchOut(
+        created=sum(r.result == "created" for r in results),
+        duplicates=sum(r.result == "duplicate" for r in results),
+        invalid=sum(r.result == "invalid" for r in results),
+        results=results,
+        truncated=truncated,
+    )
+
+
+async def _aenumerate(iterable):
+    index = 0
+    async for item in iterable:
+        yield index, item
+        index += 1
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'record'}: {error['msg']}" for error in exc.errors()
+    )
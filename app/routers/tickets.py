@@ -1,269 +1,655 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
-from sqlalchemy import select, func, update
+import base64
+import csv
+import io
+import json
+from enum import Enum
+from typing import AsyncIterator, NoReturn
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Path, Body, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import ARRAY, Integer, any_, literal, select, func, update, tuple_
 from datetime import datetime
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import get_db
-from ..models import Ticket, TicketStatus, User, UserRole
-from ..schemas import TicketsListOut, TicketOut, ClientOut, UserOut, TicketViewedUpdate
+from ..archive import tickets_with_archive
+from ..budgets import query_budget
+from ..core.config import settings
+from ..counters import count_tickets, grouped_counts
+from ..db import AsyncSessionLocal, ReadSessionLocal, get_db, get_read_db
+from ..events import Subscription, parse_cursor, replay, ticket_events
+from ..jobs import TICKET_STATUS_CHANGED, enqueue_from
+from ..models import Client, Ticket, TicketStatus, User, UserRole
+from ..search import ticket_search_filter, ticket_search_rank
+from ..schemas import (
+    TicketBulkAssignIn,
+    TicketBulkOut,
+    TicketBulkResult,
+    TicketBulkStatusIn,
+    TicketBulkViewedIn,
+    TicketOut,
+    TicketsListOut,
+    TicketViewedUpdate,
+    WorkerWorkloadOut,
+    WorkloadStatsOut,
+    ticket_out,
+)
 from ..security import get_current_user, require_role
+from ..serializers import TicketProjection, json_response
+from ..versions import table_validators
 
 
 router = APIRouter(prefix="/tickets", tags=["tickets"])
-@router.get("/stats", status_code=200)
+
+# tables whose writes can change a list or stats response (tickets embed client and worker)
+LIST_TABLES = ("tickets", "clients", "users")
+STATS_TABLES = ("tickets", "tickets_archive")
+
+
+def _encode_cursor(t) -> str:
+    raw = json.dumps([t.created_at.isoformat(), t.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, ticket_id = json.loads(raw)
+        created_at, ticket_id = datetime.fromisoformat(created_at), int(ticket_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # cursors we issue are always timezone-aware; a naive one cannot be compared to timestamptz
+    if created_at.tzinfo is None or not 0 < ticket_id <= 2**31 - 1:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, ticket_id
+
+
+def _scope_worker_id(current_user: User, worker_id: int | None) -> int | None:
+    # workers only ever see their own tickets
+    return current_user.id if current_user.role == UserRole.worker else worker_id
+
+
+def _ticket_filters(
+    current_user: User,
+    search: str | None,
+    status: TicketStatus | None,
+    worker_id: int | None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    ticket=Ticket,
+) -> list:
+    conditions = []
+    # plain bounds on the partition key let the planner skip whole months
+    if created_from is not None:
+        conditions.append(ticket.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(ticket.created_at < created_to)
+    if search:
+        conditions.append(ticket_search_filter(search, ticket))
+    if status:
+        conditions.append(ticket.status == status)
+    scope_worker_id = _scope_worker_id(current_user, worker_id)
+    if scope_worker_id is not None:
+        conditions.append(ticket.worker_id == scope_worker_id)
+    return conditions
+
+
+@router.get("/stats", status_code=200, dependencies=[query_budget(3)])
 async def tickets_stats(
+    request: Request,
+    response: Response,
     worker_id: int = Query(..., gt=0, description="Worker ID"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     await require_role(current_user, (UserRole.admin,))
+    validators = await table_validators(db, STATS_TABLES, request, current_user)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
     # assigned new = status new and has this worker
-    assigned_new = (
-        await db.execute(
-            select(func.count()).select_from(Ticket).where(
-                Ticket.worker_id == worker_id, Ticket.status == TicketStatus.new
-            )
-        )
-    ).scalar() or 0
-    in_progress = (
-        await db.execute(
-            select(func.count()).select_from(Ticket).where(
-                Ticket.worker_id == worker_id, Ticket.status == TicketStatus.in_progress
-            )
-        )
-    ).scalar() or 0
-    return {"assigned": assigned_new, "in_progress": in_progress}
+    counts = {status: count for wid, status, count in await grouped_counts(db, [worker_id]) if wid == worker_id}
+    return {
+        "assigned": counts.get(TicketStatus.new, 0),
+        "in_progress": counts.get(TicketStatus.in_progress, 0),
+    }
+
 
+@router.get(
+    "/stats/workload",
+    response_model=WorkloadStatsOut,
+    status_code=200,
+    dependencies=[query_budget(3)],
+)
+async def tickets_workload(
+    request: Request,
+    response: Response,
+    worker_id: list[int] | None = Query(None, description="Limit to these worker IDs (repeatable)"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    await require_role(current_user, (UserRole.admin,))
+    validators = await table_validators(db, STATS_TABLES, request, current_user)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    counts = {wid: WorkerWorkloadOut(worker_id=wid) for wid in worker_id or ()}
+    unassigned_new = 0
+    for wid, status, count in await grouped_counts(db, worker_id):
+        if wid is None:
+            if status == TicketStatus.new:
+                unassigned_new = count
+            continue
+        out = counts.setdefault(wid, WorkerWorkloadOut(worker_id=wid))
+        if status == TicketStatus.new:
+            out.assigned = count
+        elif status == TicketStatus.in_progress:
+            out.in_progress = count
+        else:
+            out.done = count
+    workers = sorted(counts.values(), key=lambda w: w.worker_id)
+    return WorkloadStatsOut(unassigned_new=unassigned_new, workers=workers)
 
 
-@router.get("/", response_model=TicketsListOut, status_code=200)
+@router.get("/", response_model=TicketsListOut, status_code=200, dependencies=[query_budget(4)])
 async def list_tickets(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number (1+)"),
     size: int = Query(10, ge=1, le=100, description="Page size (1-100)"),
-    search: str | None = Query(None, max_length=100, description="Search by title"),
+    cursor: str | None = Query(
+        None,
+        max_length=200,
+        description="Opaque keyset cursor from next_cursor; pass an empty value to start. Skips total count",
+    ),
+    search: str | None = Query(None, max_length=100, description="Full-text and fuzzy search in title and description"),
+    sort: str = Query(
+        "created_at",
+        pattern="^(created_at|relevance)$",
+        description="Order by newest first or by search relevance (needs search)",
+    ),
     status: TicketStatus | None = Query(None, description="Filter by status"),
     worker_id: int | None = Query(None, gt=0, description="Filter by worker ID"),
-    db: AsyncSession = Depends(get_db),
+    created_from: datetime | None = Query(None, description="Created at or after (ISO 8601)"),
+    created_to: datetime | None = Query(None, description="Created before (ISO 8601)"),
+    include_archived: bool = Query(
+        False, description="Also list archived tickets (total is null with search or date filters)"
+    ),
+    fields: str | None = Query(
+        None,
+        max_length=500,
+        description="Comma-separated fields to return, e.g. id,title,status,worker.username "
+        "(client/worker alone mean all of their fields). Default: all",
+    ),
+    include: str | None = Query(
+        None, max_length=50, description="Related objects to embed in full: client, worker"
+    ),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     await require_role(current_user, (UserRole.admin, UserRole.worker))
+    try:
+        projection = TicketProjection.parse(fields, include)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    tables = LIST_TABLES + ("tickets_archive",) if include_archived else LIST_TABLES
+    validators = await table_validators(db, tables, request, current_user)
+    if validators.matches(request):
+        return validators.not_modified()
+
+    ticket = tickets_with_archive() if include_archived else Ticket
+    # only the requested columns, joining client/worker only when one of their fields is wanted
+    query = select(*projection.columns(ticket)).select_from(ticket)
+    if projection.client:
+        query = query.join(Client, Client.id == ticket.client_id)
+    if projection.worker:
+        query = query.outerjoin(User, User.id == ticket.worker_id)
+    by_relevance = sort == "relevance" and bool(search)
+    if by_relevance and cursor is not None:
+        raise HTTPException(status_code=400, detail="Cursor pagination requires sort=created_at")
+    filters = _ticket_filters(current_user, search, status, worker_id, created_from, created_to, ticket)
+    query = query.where(*filters)
+
+    total = None
+    if cursor is None:
+        # ticket_counters cover both tables, but without search or date bounds
+        if not (search or created_from or created_to):
+            total = await count_tickets(
+                db,
+                worker_id=_scope_worker_id(current_user, worker_id),
+                status=status,
+                include_archived=include_archived,
+            )
+        elif not include_archived:
+            total_q = select(func.count()).select_from(ticket).where(*filters)
+            total = (await db.execute(total_q)).scalar() or 0
+        query = query.offset((page - 1) * size)
+    elif cursor:
+        after_created_at, after_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(ticket.created_at, ticket.id) < tuple_(after_created_at, after_id),
+            # implied by the row comparison, but only a plain bound prunes newer partitions
+            ticket.created_at <= after_created_at,
+        )
+
+    if by_relevance:
+        query = query.order_by(ticket_search_rank(search, ticket).desc())
+    # fetch one extra row to know whether another page exists
+    rows = (
+        await db.execute(query.order_by(ticket.created_at.desc(), ticket.id.desc()).limit(size + 1))
+    ).all()
+    items = rows[:size]
+    next_cursor = _encode_cursor(items[-1]) if len(rows) > size and not by_relevance else None
+
+    # built straight from the rows and encoded once; response_model above only documents the shape
+    return json_response(
+        {
+            "items": [projection.item(row._mapping) for row in items],
+            "total": total,
+            "page": page,
+            "size": size,
+            "next_cursor": next_cursor,
+        },
+        headers=validators.headers(),
+    )
+
+
+def _export_columns(ticket) -> tuple:
+    return (
+        ticket.id,
+        ticket.title,
+        ticket.description,
+        ticket.status,
+        ticket.viewed,
+        ticket.created_at,
+        ticket.updated_at,
+        ticket.assigned_at,
+        ticket.in_progress_at,
+        ticket.done_at,
+        ticket.requester_ip,
+        ticket.requester_ua,
+        Client.id.label("client_id"),
+        Client.name.label("client_name"),
+        Client.email.label("client_email"),
+        Client.phone.label("client_phone"),
+        User.id.label("worker_id"),
+        User.username.label("worker_username"),
+    )
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
 
+
+def _export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _export_rows(query, fmt: str, request: Request) -> AsyncIterator[str]:
+    # own session: the request's session is closed once the endpoint returns, before streaming
+    async with ReadSessionLocal(info={"request": request}) as session:
+        result = await session.stream(query.execution_options(yield_per=settings.export_fetch_size))
+        names = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == "csv":
+            writer.writerow(names)
+        async for partition in result.partitions():
+            for row in partition:
+                values = [_export_value(v) for v in row]
+                if fmt == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(names, values)), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+@router.get(
+    "/export",
+    status_code=200,
+    dependencies=[query_budget(2)],
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/csv": {}, "application/x-ndjson": {}}}},
+)
+async def export_tickets(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    search: str | None = Query(None, max_length=100, description="Full-text and fuzzy search in title and description"),
+    status: TicketStatus | None = Query(None, description="Filter by status"),
+    worker_id: int | None = Query(None, gt=0, description="Filter by worker ID"),
+    created_from: datetime | None = Query(None, description="Created at or after (ISO 8601)"),
+    created_to: datetime | None = Query(None, description="Created before (ISO 8601)"),
+    include_archived: bool = Query(False, description="Also export archived tickets"),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream every matching ticket (newest first) with client and worker fields flattened."""
+    await require_role(current_user, (UserRole.admin, UserRole.worker))
+    ticket = tickets_with_archive() if include_archived else Ticket
     query = (
-        select(Ticket)
-        .options(selectinload(Ticket.client))
-        .options(selectinload(Ticket.worker))
+        select(*_export_columns(ticket))
+        .select_from(ticket)
+        .join(Client, Client.id == ticket.client_id)
+        .outerjoin(User, User.id == ticket.worker_id)
+        .where(*_ticket_filters(current_user, search, status, worker_id, created_from, created_to, ticket))
+        .order_by(ticket.created_at.desc(), ticket.id.desc())
+    )
+    return StreamingResponse(
+        _export_rows(query, format, request),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tickets.{format}"'},
     )
-    if search:
-        query = query.where(Ticket.title.ilike(f"%{search}%"))
-    if status:
-        query = query.where(Ticket.status == status)
-    if current_user.role == UserRole.worker:
-        query = query.where(Ticket.worker_id == current_user.id)
-    else:
-        if worker_id is not None:
-            query = query.where(Ticket.worker_id == worker_id)
 
-    total_q = select(func.count()).select_from(query.subquery())
-    total = (await db.execute(total_q)).scalar() or 0
 
-    items = (await db.execute(query.order_by(Ticket.created_at.desc()).offset((page - 1) * size).limit(size))).scalars().all()
+def _sse(event: dict) -> str:
+    return f"id: {event['cursor']}\nevent: {event['kind']}\ndata: {json.dumps(event)}\n\n"
 
-    def to_out(t: Ticket) -> TicketOut:
-        worker_out = (
-            UserOut(id=t.worker.id, username=t.worker.username, role=t.worker.role, created_at=t.worker.created_at)
-            if t.worker
-            else None
-        )
-        client = t.client
-        return TicketOut(
-            id=t.id,
-            title=t.title,
-            description=t.description,
-            status=t.status,
-            client=ClientOut(id=client.id, name=client.name, email=client.email, phone=client.phone, created_at=client.created_at),
-            worker=worker_out,
-            created_at=t.created_at,
-            updated_at=t.updated_at,
-            assigned_at=t.assigned_at,
-            in_progress_at=t.in_progress_at,
-            done_at=t.done_at,
-            requester_ip=t.requester_ip,
-            requester_ua=t.requester_ua,
-        )
 
-    return TicketsListOut(items=[to_out(i) for i in items], total=total, page=page, size=size)
+async def _event_stream(
+    request: Request, subscription: Subscription, after: tuple[int, int | None] | None
+) -> AsyncIterator[str]:
+    try:
+        yield "retry: 3000\n\n"
+        replayed: set[int] = set()
+        if after is not None:
+            # already LISTENing, so anything committed from here on is also queued; skip those dups
+            async with AsyncSessionLocal() as session:
+                events = await replay(
+                    session, *after, subscription.worker_id, settings.events_replay_limit + 1
+                )
+            if len(events) > settings.events_replay_limit:
+                yield 'event: reset\ndata: {"reason": "too_far_behind"}\n\n'
+            else:
+                for event in events:
+                    replayed.add(event["id"])
+                    yield _sse(event)
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.events_heartbeat_seconds
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                # dropped (slow client or listener reconnect): the client resumes with Last-Event-ID
+                return
+            if event["id"] not in replayed:
+                yield _sse(event)
+    finally:
+        ticket_events.unsubscribe(subscription)
 
 
-@router.post("/{ticket_id}/viewed", response_model=TicketOut, status_code=200)
-async def mark_viewed(
-    ticket_id: int = Path(..., gt=0, description="Ticket ID"),
-    payload: TicketViewedUpdate = Body(..., description="Viewed status update"),
-    db: AsyncSession = Depends(get_db),
+@router.get(
+    "/events",
+    status_code=200,
+    dependencies=[query_budget(2)],
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def ticket_event_feed(
+    request: Request,
+    last_event_id: str | None = Query(None, description="Resume after this event ID (cursor)"),
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
     current_user: User = Depends(get_current_user),
 ):
+    """Server-sent events for ticket created/assigned/status/viewed changes; workers get their own."""
     await require_role(current_user, (UserRole.admin, UserRole.worker))
-    ticket = (
-        await db.execute(
-            select(Ticket)
-            .options(selectinload(Ticket.client))
-            .options(selectinload(Ticket.worker))
-            .where(Ticket.id == ticket_id)
-        )
-    ).scalar_one_or_none()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-    if current_user.role == UserRole.worker and ticket.worker_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Cannot modify other worker's ticket")
-    await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(viewed=payload.viewed))
+    after = None
+    if last_event_id := last_event_id or last_event_id_header:
+        try:
+            after = parse_cursor(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    try:
+        subscription = await ticket_events.subscribe(_scope_worker_id(current_user, None))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Event feed unavailable", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        _event_stream(request, subscription, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _own_ticket_conditions(current_user: User) -> tuple:
+    if current_user.role == UserRole.worker:
+        return (Ticket.worker_id == current_user.id,)
+    return ()
+
+
+def _status_values(new_status: TicketStatus) -> dict:
+    set_vals = {"status": new_status, "updated_at": func.now()}
+    if new_status == TicketStatus.in_progress:
+        set_vals["in_progress_at"] = func.now()
+    if new_status == TicketStatus.done:
+        set_vals["done_at"] = func.now()
+    return set_vals
+
+
+def _with_status_jobs(upd, query):
+    # one tickets.status_changed job per updated row, committed with the update itself
+    return query.add_cte(
+        enqueue_from(TICKET_STATUS_CHANGED, upd, ticket_id=upd.c.id, status=upd.c.status).cte("job")
+    )
+
+
+async def _bulk_update(
+    db: AsyncSession, ids: list[int], values: dict, *conditions, status_jobs: bool = False
+) -> TicketBulkOut:
+    """Apply one set-based UPDATE to many tickets and report the outcome per ID."""
+    ids = list(dict.fromkeys(ids))
+    id_array = literal(sorted(ids), ARRAY(Integer))
+    # rows are locked in id order, so two overlapping bulk updates cannot deadlock
+    locked = (
+        select(Ticket.id, Ticket.created_at)
+        .where(Ticket.id == any_(id_array))
+        .order_by(Ticket.id)
+        .with_for_update()
+        .cte("locked")
+    )
+    query = (
+        update(Ticket)
+        .where(Ticket.id == locked.c.id, Ticket.created_at == locked.c.created_at, *conditions)
+        .values(**values)
+        .returning(Ticket.id, Ticket.status)
+    )
+    if status_jobs:
+        upd = query.cte("upd")
+        query = _with_status_jobs(upd, select(upd.c.id))
+    updated = set(
+        (await db.execute(query.execution_options(synchronize_session=False))).scalars()
+    )
+    existing = updated
+    if len(updated) < len(ids):
+        existing = set((await db.execute(select(Ticket.id).where(Ticket.id == any_(id_array)))).scalars())
     await db.commit()
-    ticket = (
-        await db.execute(
-            select(Ticket)
-            .options(selectinload(Ticket.client))
-            .options(selectinload(Ticket.worker))
-            .where(Ticket.id == ticket_id)
+    results = [
+        TicketBulkResult(
+            id=i, result="updated" if i in updated else "forbidden" if i in existing else "not_found"
         )
-    ).scalar_one()
-    client = ticket.client
-    worker = ticket.worker
-    worker_out = (
-        UserOut(id=worker.id, username=worker.username, role=worker.role, created_at=worker.created_at)
-        if worker
-        else None
-    )
-    return TicketOut(
-        id=ticket.id,
-        title=ticket.title,
-        description=ticket.description,
-        status=ticket.status,
-        viewed=ticket.viewed,
-        client=ClientOut(id=client.id, name=client.name, email=client.email, phone=client.phone, created_at=client.created_at),
-        worker=worker_out,
-        created_at=ticket.created_at,
-        updated_at=ticket.updated_at,
+        for i in ids
+    ]
+    return TicketBulkOut(updated=len(updated), results=results)
+
+
+@router.post(
+    "/bulk/viewed",
+    response_model=TicketBulkOut,
+    status_code=200,
+    dependencies=[query_budget(3)],
+)
+async def bulk_mark_viewed(
+    payload: TicketBulkViewedIn,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    await require_role(current_user, (UserRole.admin, UserRole.worker))
+    return await _bulk_update(
+        db, payload.ids, {"viewed": payload.viewed}, *_own_ticket_conditions(current_user)
     )
 
 
-@router.post("/{ticket_id}/assign", response_model=TicketOut, status_code=200)
-async def assign_ticket(
-    ticket_id: int = Path(..., gt=0, description="Ticket ID"),
-    worker_id: int = Body(..., gt=0, description="Worker ID"),
+@router.post(
+    "/bulk/assign",
+    response_model=TicketBulkOut,
+    status_code=200,
+    dependencies=[query_budget(4)],
+)
+async def bulk_assign(
+    payload: TicketBulkAssignIn,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     await require_role(current_user, (UserRole.admin,))
-    ticket = (
+    worker = (
         await db.execute(
-            select(Ticket)
-            .options(selectinload(Ticket.client))
-            .options(selectinload(Ticket.worker))
-            .where(Ticket.id == ticket_id)
+            select(User.id).where(
+                User.id == payload.worker_id, User.role == UserRole.worker, User.disabled_at.is_(None)
+            )
         )
     ).scalar_one_or_none()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-    # Ensure worker exists and is a worker role
-    worker = (
-        await db.execute(select(User).where(User.id == worker_id, User.role == UserRole.worker))
-    ).scalar_one_or_none()
     if not worker:
         raise HTTPException(status_code=400, detail="Worker not found or not a worker")
+    return await _bulk_update(
+        db,
+        payload.ids,
+        {"worker_id": payload.worker_id, "updated_at": func.now(), "assigned_at": func.now()},
+    )
 
-    await db.execute(
-        update(Ticket)
-        .where(Ticket.id == ticket_id)
-        .values(worker_id=worker_id, updated_at=datetime.utcnow(), assigned_at=datetime.utcnow())
+
+@router.post(
+    "/bulk/status",
+    response_model=TicketBulkOut,
+    status_code=200,
+    dependencies=[query_budget(3)],
+)
+async def bulk_update_status(
+    payload: TicketBulkStatusIn,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    await require_role(current_user, (UserRole.admin, UserRole.worker))
+    return await _bulk_update(
+        db,
+        payload.ids,
+        _status_values(payload.new_status),
+        *_own_ticket_conditions(current_user),
+        status_jobs=True,
     )
-    await db.commit()
-    ticket = (
-        await db.execute(
-            select(Ticket)
-            .options(selectinload(Ticket.client))
-            .options(selectinload(Ticket.worker))
-            .where(Ticket.id == ticket_id)
-        )
-    ).scalar_one()
-    client = ticket.client
-    worker = ticket.worker
-    worker_out = (
-        UserOut(id=worker.id, username=worker.username, role=worker.role, created_at=worker.created_at)
-        if worker
-        else None
+
+
+async def _update_returning(
+    db: AsyncSession, ticket_id: int, values: dict, *conditions, status_jobs: bool = False
+) -> tuple[Ticket, Client, User | None] | None:
+    """Apply an UPDATE and load the row with its client and worker in one statement."""
+    upd = (
+        update(Ticket)
+        .where(Ticket.id == ticket_id, *conditions)
+        .values(**values)
+        .returning(*Ticket.__table__.c)
+        .cte("upd")
     )
-    return TicketOut(
-        id=ticket.id,
-        title=ticket.title,
-        description=ticket.description,
-        status=ticket.status,
-        assigned_at=ticket.assigned_at,
-        in_progress_at=ticket.in_progress_at,
-        done_at=ticket.done_at,
-        requester_ip=ticket.requester_ip,
-        requester_ua=ticket.requester_ua,
-        client=ClientOut(id=client.id, name=client.name, email=client.email, phone=client.phone, created_at=client.created_at),
-        worker=worker_out,
-        created_at=ticket.created_at,
-        updated_at=ticket.updated_at,
+    t = aliased(Ticket, upd)
+    query = (
+        select(t, Client, User)
+        .join(Client, Client.id == t.client_id)
+        .outerjoin(User, User.id == t.worker_id)
     )
+    if status_jobs:
+        query = _with_status_jobs(upd, query)
+    row = (await db.execute(query.execution_options(populate_existing=True))).first()
+    return tuple(row) if row else None
 
 
-@router.post("/{ticket_id}/status", response_model=TicketOut, status_code=200)
-async def update_status(
+async def _raise_not_updated(
+    db: AsyncSession, ticket_id: int, detail: str, status_code: int = 403
+) -> NoReturn:
+    # only reached when the guarded UPDATE matched nothing: tell 404 from a failed guard
+    found = (await db.execute(select(Ticket.id).where(Ticket.id == ticket_id))).first()
+    if not found:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+@router.post(
+    "/{ticket_id}/viewed",
+    response_model=TicketOut,
+    status_code=200,
+    dependencies=[query_budget(3)],
+)
+async def mark_viewed(
     ticket_id: int = Path(..., gt=0, description="Ticket ID"),
-    new_status: TicketStatus = Body(..., description="New ticket status"),
+    payload: TicketViewedUpdate = Body(..., description="Viewed status update"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     await require_role(current_user, (UserRole.admin, UserRole.worker))
-    ticket = (
-        await db.execute(
-            select(Ticket)
-            .options(selectinload(Ticket.client))
-            .options(selectinload(Ticket.worker))
-            .where(Ticket.id == ticket_id)
-        )
-    ).scalar_one_or_none()
-    if not ticket:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-    if current_user.role == UserRole.worker and ticket.worker_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Cannot modify other worker's ticket")
-    set_vals = {"status": new_status}
-    if new_status == TicketStatus.in_progress:
-        set_vals["in_progress_at"] = datetime.utcnow()
-    if new_status == TicketStatus.done:
-        set_vals["done_at"] = datetime.utcnow()
-    await db.execute(update(Ticket).where(Ticket.id == ticket_id).values(**set_vals))
+    row = await _update_returning(
+        db, ticket_id, {"viewed": payload.viewed}, *_own_ticket_conditions(current_user)
+    )
+    if not row:
+        await _raise_not_updated(db, ticket_id, "Cannot modify other worker's ticket")
     await db.commit()
-    ticket = (
-        await db.execute(
-            select(Ticket)
-            .options(selectinload(Ticket.client))
-            .options(selectinload(Ticket.worker))
-            .where(Ticket.id == ticket_id)
-        )
-    ).scalar_one()
-    client = ticket.client
-    worker = ticket.worker
-    worker_out = (
-        UserOut(id=worker.id, username=worker.username, role=worker.role, created_at=worker.created_at)
-        if worker
-        else None
+    return ticket_out(*row)
+
+
+@router.post(
+    "/{ticket_id}/assign",
+    response_model=TicketOut,
+    status_code=200,
+    dependencies=[query_budget(3)],
+)
+async def assign_ticket(
+    ticket_id: int = Path(..., gt=0, description="Ticket ID"),
+    worker_id: int = Body(..., gt=0, description="Worker ID"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    await require_role(current_user, (UserRole.admin,))
+    # Ensure worker exists and is a worker role
+    worker_exists = (
+        select(User.id)
+        .where(User.id == worker_id, User.role == UserRole.worker, User.disabled_at.is_(None))
+        .exists()
     )
-    return TicketOut(
-        id=ticket.id,
-        title=ticket.title,
-        description=ticket.description,
-        status=ticket.status,
-        assigned_at=ticket.assigned_at,
-        in_progress_at=ticket.in_progress_at,
-        done_at=ticket.done_at,
-        requester_ip=ticket.requester_ip,
-        requester_ua=ticket.requester_ua,
-        client=ClientOut(id=client.id, name=client.name, email=client.email, phone=client.phone, created_at=client.created_at),
-        worker=worker_out,
-        created_at=ticket.created_at,
-        updated_at=ticket.updated_at,
+    row = await _update_returning(
+        db,
+        ticket_id,
+        {"worker_id": worker_id, "updated_at": func.now(), "assigned_at": func.now()},
+        worker_exists,
     )
+    if not row:
+        await _raise_not_updated(db, ticket_id, "Worker not found or not a worker", status_code=400)
+    await db.commit()
+    return ticket_out(*row)
 
 
+@router.post(
+    "/{ticket_id}/status",
+    response_model=TicketOut,
+    status_code=200,
+    dependencies=[query_budget(3)],
+)
+async def update_status(
+    ticket_id: int = Path(..., gt=0, description="Ticket ID"),
+    new_status: TicketStatus = Body(..., description="New ticket status"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    await require_role(current_user, (UserRole.admin, UserRole.worker))
+    row = await _update_returning(
+        db, ticket_id, _status_values(new_status), *_own_ticket_conditions(current_user), status_jobs=True
+    )
+    if not row:
+        await _raise_not_updated(db, ticket_id, "Cannot modify other worker's ticket")
+    await db.commit()
+    return ticket_out(*row)
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, delete, update
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import get_db
-from ..models import User, UserRole, Ticket, TicketStatus
+from ..budgets import query_budget
+from ..db import get_db, get_read_db
+from ..jobs import USER_PURGE, enqueue
+from ..models import User, UserRole
 from ..schemas import UserCreate, UserOut
-from ..security import get_current_user, hash_password, require_role
+from ..security import get_current_user, hash_password, require_role, principal_cache
+from ..versions import table_validators
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.post("/", response_model=UserOut, status_code=201)
+@router.post("/", response_model=UserOut, status_code=201, dependencies=[query_budget(4)])
 async def create_user(
     payload: UserCreate,
     db: AsyncSession = Depends(get_db),
@@ -21,44 +24,50 @@ async def create_user(
     result = await db.execute(select(User).where(User.username == payload.username))
     if result.scalar_one_or_none():
         raise HTTPException(status_code=409, detail="Username already exists")
-    user = User(username=payload.username, password_hash=hash_password(payload.password), role=payload.role)
+    user = User(username=payload.username, password_hash=await hash_password(payload.password), role=payload.role)
     db.add(user)
     await db.commit()
     await db.refresh(user)
     return UserOut(id=user.id, username=user.username, role=user.role, created_at=user.created_at)
 
 
-@router.get("/", response_model=list[UserOut])
+@router.get("/", response_model=list[UserOut], dependencies=[query_budget(3)])
 async def list_users(
-    db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
 ):
     await require_role(current_user, (UserRole.admin,))
-    result = await db.execute(select(User))
+    validators = await table_validators(db, ("users",), request, current_user)
+    if validators.matches(request):
+        return validators.not_modified()
+    validators.apply(response)
+    result = await db.execute(select(User).where(User.disabled_at.is_(None)))
     users = result.scalars().all()
     return [UserOut(id=u.id, username=u.username, role=u.role, created_at=u.created_at) for u in users]
 
 
-@router.delete("/{user_id}", status_code=204)
+@router.delete("/{user_id}", status_code=204, dependencies=[query_budget(4)])
 async def delete_user(
     user_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)
 ):
     await require_role(current_user, (UserRole.admin,))
-    # Check if user exists
-    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    user = (
+        await db.execute(select(User).where(User.id == user_id, User.disabled_at.is_(None)))
+    ).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    # Reassign tickets: unassign worker and set status to new for admin review
-    await db.execute(
-        update(Ticket)
-        .where(Ticket.worker_id == user_id)
-        .values(worker_id=None, status=TicketStatus.new)
-    )
-    await db.execute(delete(User).where(User.id == user_id))
+    # Disabled users cannot log in or be assigned; the users.purge job unassigns their tickets
+    # (status new, for admin review) and deletes them outside the request
+    user.disabled_at = func.now()
+    enqueue(db, USER_PURGE, {"user_id": user_id})
     await db.commit()
+    principal_cache.invalidate(user.username)
     return None
 
 
-@router.put("/{user_id}", response_model=UserOut)
+@router.put("/{user_id}", response_model=UserOut, dependencies=[query_budget(4)])
 async def update_user(
     user_id: int,
     payload: UserCreate,
@@ -66,14 +75,18 @@ async def update_user(
     current_user: User = Depends(get_current_user),
 ):
     await require_role(current_user, (UserRole.admin,))
-    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    user = (
+        await db.execute(select(User).where(User.id == user_id, User.disabled_at.is_(None)))
+    ).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    old_username = user.username
     user.username = payload.username
     user.role = payload.role
     if payload.password:
-        user.password_hash = hash_password(payload.password)
+        user.password_hash = await hash_password(payload.password)
     await db.commit()
+    principal_cache.invalidate(old_username, user.username)
     await db.refresh(user)
     return UserOut(id=user.id, username=user.username, role=user.role, created_at=user.created_at)
 
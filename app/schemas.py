@@ -1,9 +1,9 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Literal, Optional
 
 from pydantic import BaseModel, EmailStr, Field
 
-from .models import TicketStatus, UserRole
+from .models import Client, Ticket, TicketStatus, User, UserRole
 
 
 class TokenOut(BaseModel):
@@ -49,6 +49,22 @@ class TicketCreatePublic(BaseModel):
     client: ClientIn
 
 
+class TicketBatchResult(BaseModel):
+    index: int
+    result: Literal["created", "duplicate", "invalid"]
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class TicketBatchOut(BaseModel):
+    created: int = Field(ge=0, default=0)
+    duplicates: int = Field(ge=0, default=0)
+    invalid: int = Field(ge=0, default=0)
+    results: list[TicketBatchResult]
+    # set when a limit stopped reading mid-stream: records after the last result were not read
+    truncated: Optional[str] = None
+
+
 class TicketAssignIn(BaseModel):
     worker_id: int = Field(..., gt=0, description="Valid worker ID")
 
@@ -75,12 +91,82 @@ class TicketOut(TicketBase):
 
 class TicketsListOut(BaseModel):
     items: list[TicketOut]
-    total: int = Field(ge=0, default=0)
+    total: Optional[int] = Field(ge=0, default=0)
     page: int
     size: int
+    next_cursor: Optional[str] = None
 
 
 class TicketViewedUpdate(BaseModel):
     viewed: bool
 
 
+class WorkerWorkloadOut(BaseModel):
+    worker_id: int
+    assigned: int = Field(ge=0, default=0)
+    in_progress: int = Field(ge=0, default=0)
+    done: int = Field(ge=0, default=0)
+
+
+class WorkloadStatsOut(BaseModel):
+    unassigned_new: int = Field(ge=0, default=0)
+    workers: list[WorkerWorkloadOut]
+
+
+class TicketBulkIn(BaseModel):
+    # bounded to int4 so an out-of-range ID fails validation, not the integer[] cast
+    ids: list[Annotated[int, Field(gt=0, le=2**31 - 1)]] = Field(
+        ..., min_length=1, max_length=5000, description="Ticket IDs (1-5000)"
+    )
+
+
+class TicketBulkAssignIn(TicketBulkIn):
+    worker_id: int = Field(..., gt=0, description="Valid worker ID")
+
+
+class TicketBulkStatusIn(TicketBulkIn):
+    new_status: TicketStatus
+
+
+class TicketBulkViewedIn(TicketBulkIn):
+    viewed: bool
+
+
+class TicketBulkResult(BaseModel):
+    id: int
+    result: Literal["updated", "not_found", "forbidden"]
+
+
+class TicketBulkOut(BaseModel):
+    updated: int = Field(ge=0)
+    results: list[TicketBulkResult]
+
+
+
+
+def user_out(u: User) -> UserOut:
+    return UserOut(id=u.id, username=u.username, role=u.role, created_at=u.created_at)
+
+
+def client_out(c: Client) -> ClientOut:
+    return ClientOut(id=c.id, name=c.name, email=c.email, phone=c.phone, created_at=c.created_at)
+
+
+def ticket_out(t: Ticket, client: Client, worker: User | None) -> TicketOut:
+    """Single serializer for tickets; client and worker are passed in so callers control loading."""
+    return TicketOut(
+        id=t.id,
+        title=t.title,
+        description=t.description,
+        status=t.status,
+        viewed=t.viewed,
+        client=client_out(client),
+        worker=user_out(worker) if worker else None,
+        created_at=t.created_at,
+        updated_at=t.updated_at,
+        assigned_at=t.assigned_at,
+        in_progress_at=t.in_progress_at,
+        done_at=t.done_at,
+        requester_ip=t.requester_ip,
+        requester_ua=t.requester_ua,
+    )
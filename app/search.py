@@ -0,0 +1,37 @@
+from sqlalchemy import ColumnElement, func, or_
+
+from .models import Ticket
+
+
+# 'simple' keeps matching language-agnostic; pg_trgm covers typos and word fragments
+SEARCH_CONFIG = "simple"
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def ticket_search_filter(term: str, ticket=Ticket) -> ColumnElement[bool]:
+    """Match tickets by full-text query, substring or trigram similarity on title/description.
+
+    Every branch is served by a GIN index (search_vector, title/description gin_trgm_ops).
+    ``ticket`` may be an alias of Ticket, such as app.archive.tickets_with_archive().
+    """
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    pattern = _like_pattern(term)
+    return or_(
+        ticket.search_vector.op("@@")(tsquery),
+        ticket.title.ilike(pattern, escape="\\"),
+        ticket.description.ilike(pattern, escape="\\"),
+        ticket.title.op("%")(term),
+        ticket.description.op("%>")(term),
+    )
+
+
+def ticket_search_rank(term: str, ticket=Ticket) -> ColumnElement[float]:
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, term)
+    return func.ts_rank_cd(ticket.search_vector, tsquery) + func.greatest(
+        func.similarity(ticket.title, term),
+        func.word_similarity(term, ticket.description),
+    )
@@ -1,7 +1,11 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -10,6 +14,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from .core.config import settings
 from .db import get_db
+from .metrics import PASSWORD_HASH_QUEUE_TIME, PASSWORD_HASH_REJECTED, PASSWORD_HASH_TIME
 from .models import User, UserRole
 
 
@@ -17,12 +22,134 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def verify_password(plain_password: str, password_hash: str) -> bool:
-    return pwd_context.verify(plain_password, password_hash)
-
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+class PrincipalCache:
+    """TTL + LRU cache of resolved users keyed by token subject (username).
+
+    Only a snapshot of the public columns is kept; every hit returns a fresh transient
+    ``User`` so request handlers never share ORM state. Callers take ``generation(subject)``
+    before reading the user and pass it to ``put``: a subject invalidated in between (its
+    generation moved on) is not cached from that now stale read.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        # generation of each recently invalidated subject; forgetting one raises the floor,
+        # which every subject's generation is at least
+        self._counter = 0
+        self._floor = 0
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+
+    def get(self, subject: str) -> User | None:
+        entry = self._entries.get(subject)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[subject]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        return User(**entry[1])
+
+    def generation(self, subject: str) -> int:
+        return max(self._floor, self._invalidated.get(subject, 0))
+
+    def put(self, user: User, generation: int) -> None:
+        if self.maxsize <= 0 or generation != self.generation(user.username):
+            return
+        snapshot = {"id": user.id, "username": user.username, "role": user.role, "created_at": user.created_at}
+        self._entries[user.username] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(user.username)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str) -> None:
+        for subject in subjects:
+            self._entries.pop(subject, None)
+            self._counter += 1
+            self._invalidated[subject] = self._counter
+            self._invalidated.move_to_end(subject)
+        while len(self._invalidated) > max(self.maxsize, 1):
+            self._invalidated.popitem(last=False)
+            self._floor = self._counter
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated.clear()
+        self._counter += 1
+        self._floor = self._counter
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded thread pool so hashing never blocks the event loop."""
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    async def run(self, operation: str, fn, *args):
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            PASSWORD_HASH_REJECTED.inc(operation)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service busy, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            # both durations are taken in the worker thread, so neither includes the wait for
+            # the event loop to resume this coroutine
+            started = time.perf_counter()
+            result = fn(*args)
+            return started - submitted, time.perf_counter() - started, result
+
+        loop = asyncio.get_running_loop()
+        try:
+            queued, elapsed, result = await loop.run_in_executor(self._executor, timed)
+        finally:
+            self.in_flight -= 1
+        # observed back on the event loop thread, like every other metric
+        PASSWORD_HASH_QUEUE_TIME.observe(queued, operation)
+        PASSWORD_HASH_TIME.observe(elapsed, operation)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_queue_limit)
+
+
+async def verify_password(plain_password: str, password_hash: str) -> bool:
+    return await password_hasher.run("verify", pwd_context.verify, plain_password, password_hash)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.run("hash", pwd_context.hash, password)
 
 
 def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
@@ -35,6 +162,7 @@ def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
 
 
 async def get_current_user(
+    request: Request,
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> User:
@@ -51,10 +179,18 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalar_one_or_none()
-    if not user:
-        raise credentials_exception
+    user = principal_cache.get(username)
+    if user is None:
+        generation = principal_cache.generation(username)
+        result = await db.execute(select(User).where(User.username == username, User.disabled_at.is_(None)))
+        user = result.scalar_one_or_none()
+        if not user:
+            raise credentials_exception
+        principal_cache.put(user, generation)
+    # read-your-writes: commits on this session pin the subject's reads to the primary
+    request.state.subject = username
+    db.info["subject"] = username
+    db.info["request"] = request
     return user
 
 
@@ -0,0 +1,134 @@
+"""Fast-path JSON for hot list endpoints.
+
+List rows are fetched as plain column tuples (only the columns the caller asked for), turned
+into dicts with the same keys and order as the pydantic ``*Out`` models and encoded with orjson
+in one pass, skipping response-model validation. Routes keep their ``response_model`` so the
+OpenAPI schema still documents the full shape; benchmarks/serialization.py checks the output
+against the pydantic path.
+"""
+
+from collections.abc import Mapping
+
+import orjson
+from fastapi import Response
+
+from .models import Client, Ticket, User
+
+
+# OPT_UTC_Z renders UTC datetimes with a "Z" suffix, as pydantic does
+JSON_OPTIONS = orjson.OPT_UTC_Z
+
+# field name -> column, in TicketOut / ClientOut / UserOut order
+TICKET_FIELDS = {
+    "title": Ticket.title,
+    "description": Ticket.description,
+    "status": Ticket.status,
+    "viewed": Ticket.viewed,
+    "id": Ticket.id,
+    "created_at": Ticket.created_at,
+    "updated_at": Ticket.updated_at,
+    "assigned_at": Ticket.assigned_at,
+    "in_progress_at": Ticket.in_progress_at,
+    "done_at": Ticket.done_at,
+    "requester_ip": Ticket.requester_ip,
+    "requester_ua": Ticket.requester_ua,
+}
+CLIENT_FIELDS = {
+    "name": Client.name,
+    "email": Client.email,
+    "phone": Client.phone,
+    "id": Client.id,
+    "created_at": Client.created_at,
+}
+WORKER_FIELDS = {
+    "username": User.username,
+    "role": User.role,
+    "id": User.id,
+    "created_at": User.created_at,
+}
+RELATIONS = {"client": CLIENT_FIELDS, "worker": WORKER_FIELDS}
+
+
+class TicketProjection:
+    """Which ticket, client and worker fields a list response carries.
+
+    ``id`` and ``created_at`` are always selected (the keyset cursor needs them) but only
+    emitted when requested; the client join and the worker outer join are skipped when no field
+    of theirs is wanted.
+    """
+
+    def __init__(self, ticket: set[str], client: set[str], worker: set[str]):
+        self.ticket = [f for f in TICKET_FIELDS if f in ticket]
+        self.client = [f for f in CLIENT_FIELDS if f in client]
+        self.worker = [f for f in WORKER_FIELDS if f in worker]
+        # nested objects sit right after "id", as in TicketOut
+        self._order: list[str] = []
+        for f in self.ticket:
+            self._order.append(f)
+            if f == "id":
+                self._order.extend(name for name in RELATIONS if getattr(self, name))
+        if "id" not in self.ticket:
+            self._order.extend(name for name in RELATIONS if getattr(self, name))
+
+    @classmethod
+    def parse(cls, fields: str | None, include: str | None) -> "TicketProjection":
+        """Parse ``?fields=id,title,worker.username`` and ``?include=client,worker``.
+
+        Without ``fields`` every ticket field is returned; without either parameter the client
+        and worker are included too. Raises ValueError naming the first unknown field.
+        """
+        ticket: set[str] = set()
+        nested: dict[str, set[str]] = {name: set() for name in RELATIONS}
+        if not fields:
+            ticket.update(TICKET_FIELDS)
+            if not include:
+                for name, columns in RELATIONS.items():
+                    nested[name].update(columns)
+        else:
+            for token in filter(None, (part.strip() for part in fields.split(","))):
+                relation, _, field = token.partition(".")
+                if not field and token in TICKET_FIELDS:
+                    ticket.add(token)
+                elif not field and token in RELATIONS:
+                    nested[token].update(RELATIONS[token])
+                elif field and field in RELATIONS.get(relation, ()):
+                    nested[relation].add(field)
+                else:
+                    raise ValueError(f"Unknown field: {token}")
+        for token in filter(None, (part.strip() for part in (include or "").split(","))):
+            if token not in RELATIONS:
+                raise ValueError(f"Unknown include: {token}")
+            nested[token].update(RELATIONS[token])
+        return cls(ticket, nested["client"], nested["worker"])
+
+    def columns(self, ticket=Ticket) -> list:
+        """Columns to select; ``ticket`` may be an alias of Ticket (field names are its attributes)."""
+        columns = [getattr(ticket, f).label(f) for f in self.ticket]
+        columns += [getattr(ticket, f).label(f) for f in ("id", "created_at") if f not in self.ticket]
+        columns += [CLIENT_FIELDS[f].label(f"client_{f}") for f in self.client]
+        columns += [WORKER_FIELDS[f].label(f"worker_{f}") for f in self.worker]
+        if self.worker and "id" not in self.worker:
+            # tells an unassigned ticket (outer join miss) apart from a worker with null fields
+            columns.append(User.id.label("worker_id"))
+        return columns
+
+    def item(self, row: Mapping) -> dict:
+        out = {}
+        for key in self._order:
+            if key == "client":
+                out["client"] = {f: row[f"client_{f}"] for f in self.client}
+            elif key == "worker":
+                has_worker = row["worker_id"] is not None
+                out["worker"] = {f: row[f"worker_{f}"] for f in self.worker} if has_worker else None
+            else:
+                out[key] = row[key]
+        return out
+
+
+def json_response(content, status_code: int = 200, headers: dict[str, str] | None = None) -> Response:
+    return Response(
+        content=orjson.dumps(content, option=JSON_OPTIONS),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
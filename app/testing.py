@@ -0,0 +1,89 @@
+"""Pytest plugin for SQL statement budgets.
+
+Enable it in ``conftest.py`` with ``pytest_plugins = ["app.testing"]``. Every test then runs
+with QUERY_BUDGET_MODE=raise, so a route exceeding its ``query_budget(n)`` fails with
+QueryBudgetExceeded, and the ``query_log`` fixture records what each request ran::
+
+    async def test_list_tickets(client, auth, query_log):
+        with query_log.expect(max_statements=4):
+            await client.get("/tickets/", headers=auth)
+        assert not query_log.repeated()
+"""
+
+import collections
+from contextlib import contextmanager
+
+import pytest
+
+from .budgets import observers
+from .core.config import settings
+from .metrics import RequestDbStats
+
+
+class RequestQueries:
+    def __init__(self, method: str, route: str, stats: RequestDbStats):
+        self.method = method
+        self.route = route
+        self.statements = stats.statements
+        self.shapes = collections.Counter(stats.shapes)
+
+    def __repr__(self) -> str:
+        return f"<{self.method} {self.route}: {self.statements} statements>"
+
+
+class QueryLog:
+    """SQL statements of every request served while the fixture is active."""
+
+    def __init__(self):
+        self.requests: list[RequestQueries] = []
+
+    def record(self, method: str, route: str, stats: RequestDbStats) -> None:
+        self.requests.append(RequestQueries(method, route, stats))
+
+    def clear(self) -> None:
+        self.requests.clear()
+
+    def statements(self, route: str | None = None, method: str | None = None) -> int:
+        return sum(
+            r.statements
+            for r in self.requests
+            if (route is None or r.route == route) and (method is None or r.method == method)
+        )
+
+    def repeated(self, threshold: int = 2) -> list[tuple[str, str, int]]:
+        """(route, statement shape, executions) run ``threshold``+ times within one request."""
+        return [
+            (f"{r.method} {r.route}", shape, count)
+            for r in self.requests
+            for shape, count in r.shapes.items()
+            if count >= threshold
+        ]
+
+    @contextmanager
+    def expect(self, max_statements: int):
+        """Fail if the requests made inside the block run more than ``max_statements``."""
+        start = len(self.requests)
+        yield
+        made = self.requests[start:]
+        total = sum(r.statements for r in made)
+        if total > max_statements:
+            shapes: collections.Counter[str] = collections.Counter()
+            for r in made:
+                shapes.update(r.shapes)
+            details = "\n".join(f"  {count} x {shape}" for shape, count in shapes.most_common())
+            raise AssertionError(
+                f"{made} ran {total} SQL statements, expected at most {max_statements}:\n{details}"
+            )
+
+
+@pytest.fixture(autouse=True)
+def _raise_on_query_budget(monkeypatch):
+    monkeypatch.setattr(settings, "query_budget_mode", "raise")
+
+
+@pytest.fixture
+def query_log():
+    log = QueryLog()
+    observers.append(log.record)
+    yield log
+    observers.remove(log.record)
@@ -0,0 +1,287 @@
+"""Scripted load scenarios against the API, reported as p50/p95/p99 latency and throughput.
+
+Usage:
+    python -m benchmarks.load run [--base-url http://localhost:8000 | --in-process]
+        [--scenario NAME ...] [--duration 30] [--concurrency 20] [--output results.json]
+    python -m benchmarks.load compare OLD.json NEW.json
+
+Seed first with ``python -m benchmarks.seed``; scenarios log in as its bench users. Each
+scenario runs alone for ``--duration`` seconds with ``--concurrency`` concurrent clients that
+issue requests back to back. Results go to benchmarks/results/<time>-<commit>.json unless
+``--output`` is given; ``compare`` prints the change per scenario between two such files.
+``--in-process`` serves the app through httpx's ASGI transport (client and server share one
+event loop, so only use it to smoke-test the scenarios).
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.seed import PASSWORD
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SEARCH_TERMS = ("screen", "battery", "laptop", "printer", "overheat", "wifi", "urgent", "boot")
+STATUSES = ("new", "in_progress", "done")
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.statuses: collections.Counter[str] = collections.Counter()
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.latencies.append(time.perf_counter() - start)
+            self.statuses[type(exc).__name__] += 1
+            return None
+        self.latencies.append(time.perf_counter() - start)
+        self.statuses[str(response.status_code)] += 1
+        return response
+
+    def summary(self, elapsed: float) -> dict:
+        count = len(self.latencies)
+        ok = sum(n for code, n in self.statuses.items() if code.isdigit() and int(code) < 400)
+        result = {"requests": count, "errors": count - ok, "rps": round(count / elapsed, 1)}
+        if count >= 2:
+            cuts = statistics.quantiles(self.latencies, n=100, method="inclusive")
+            result.update(
+                {
+                    "p50_ms": round(cuts[49] * 1000, 2),
+                    "p95_ms": round(cuts[94] * 1000, 2),
+                    "p99_ms": round(cuts[98] * 1000, 2),
+                    "max_ms": round(max(self.latencies) * 1000, 2),
+                }
+            )
+        result["statuses"] = dict(sorted(self.statuses.items()))
+        return result
+
+
+class Context:
+    """Tokens and ticket IDs shared by the scenarios, fetched once before they run."""
+
+    def __init__(self, client: httpx.AsyncClient, workers: int):
+        self.client = client
+        self.workers = workers
+        self.admin: dict[str, str] = {}
+        # (auth headers, ticket ids assigned to that worker)
+        self.worker_tickets: list[tuple[dict[str, str], list[int]]] = []
+        self.worker_ids: list[int] = []
+
+    async def login(self, username: str) -> dict[str, str]:
+        response = await self.client.post(
+            "/auth/login", json={"username": username, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def prepare(self) -> None:
+        self.admin = await self.login("bench-admin")
+        users = (await self.client.get("/users/", headers=self.admin)).json()
+        self.worker_ids = [u["id"] for u in users if u["username"].startswith("bench-worker-")]
+        for n in range(1, self.workers + 1):
+            headers = await self.login(f"bench-worker-{n}")
+            page = await self.client.get(
+                "/tickets/", params={"size": 100, "fields": "id"}, headers=headers
+            )
+            ids = [item["id"] for item in page.json()["items"]]
+            if ids:
+                self.worker_tickets.append((headers, ids))
+        if not self.worker_ids or not self.worker_tickets:
+            raise SystemExit("no bench workers with tickets: run python -m benchmarks.seed first")
+
+    async def dataset(self) -> dict:
+        response = await self.client.get("/tickets/", params={"size": 1}, headers=self.admin)
+        return {"tickets": response.json().get("total"), "workers": len(self.worker_ids)}
+
+
+async def public_flood(ctx: Context, rec: Recorder, state: dict) -> None:
+    key = uuid.uuid4().hex
+    await rec.request(
+        ctx.client,
+        "POST",
+        "/public/tickets",
+        json={
+            "title": f"Flood ticket {key[:8]}",
+            "description": f"Load test submission {key}",
+            "client": {"name": "Flood Client", "email": f"flood-{key[:12]}@example.com"},
+        },
+    )
+
+
+async def admin_list(ctx: Context, rec: Recorder, state: dict) -> None:
+    params = random.choice(
+        (
+            {"size": 50},
+            {"size": 50, "status": random.choice(STATUSES)},
+            {"size": 50, "worker_id": random.choice(ctx.worker_ids)},
+            {"size": 20, "search": random.choice(SEARCH_TERMS)},
+            {"size": 50, "fields": "id,title,status,worker.username"},
+            {"size": 50, "cursor": state.get("cursor")} if state.get("cursor") else {"size": 50},
+        )
+    )
+    response = await rec.request(ctx.client, "GET", "/tickets/", params=params, headers=ctx.admin)
+    if response is not None and response.status_code == 200:
+        # walk forward through the pages between the other queries
+        state["cursor"] = response.json().get("next_cursor")
+
+
+async def worker_updates(ctx: Context, rec: Recorder, state: dict) -> None:
+    headers, ids = random.choice(ctx.worker_tickets)
+    await rec.request(
+        ctx.client,
+        "POST",
+        f"/tickets/{random.choice(ids)}/status",
+        json=random.choice(("in_progress", "done")),
+        headers=headers,
+    )
+
+
+async def login_storm(ctx: Context, rec: Recorder, state: dict) -> None:
+    await rec.request(
+        ctx.client,
+        "POST",
+        "/auth/login",
+        json={"username": f"bench-worker-{random.randint(1, ctx.workers)}", "password": PASSWORD},
+    )
+
+
+async def stats_polling(ctx: Context, rec: Recorder, state: dict) -> None:
+    # dashboards poll with the validator from their last response
+    if random.random() < 0.5:
+        path, params = "/tickets/stats/workload", {}
+    else:
+        path, params = "/tickets/stats", {"worker_id": random.choice(ctx.worker_ids)}
+    key = f"{path}?{params}"
+    headers = dict(ctx.admin)
+    if key in state:
+        headers["If-None-Match"] = state[key]
+    response = await rec.request(ctx.client, "GET", path, params=params, headers=headers)
+    if response is not None and "etag" in response.headers:
+        state[key] = response.headers["etag"]
+
+
+SCENARIOS = {
+    "public_flood": public_flood,
+    "admin_list": admin_list,
+    "worker_updates": worker_updates,
+    "login_storm": login_storm,
+    "stats_polling": stats_polling,
+}
+
+
+async def run_scenario(ctx: Context, scenario, duration: float, concurrency: int) -> dict:
+    rec = Recorder()
+    deadline = time.perf_counter() + duration
+
+    async def user() -> None:
+        state: dict = {}
+        while time.perf_counter() < deadline:
+            await scenario(ctx, rec, state)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return rec.summary(time.perf_counter() - start)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> None:
+    if args.in_process:
+        from app.main import app
+
+        for handler in app.router.on_startup:
+            await handler()
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits)
+    async with client:
+        ctx = Context(client, args.workers)
+        await ctx.prepare()
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "base_url": "in-process" if args.in_process else args.base_url,
+                "duration_s": args.duration,
+                "concurrency": args.concurrency,
+                "dataset": await ctx.dataset(),
+            },
+            "scenarios": {},
+        }
+        for name in args.scenario or SCENARIOS:
+            summary = await run_scenario(ctx, SCENARIOS[name], args.duration, args.concurrency)
+            results["scenarios"][name] = summary
+            print(
+                f"{name:15} {summary['rps']:8.1f} req/s  p50 {summary.get('p50_ms', 0):8.2f} ms  "
+                f"p95 {summary.get('p95_ms', 0):8.2f} ms  p99 {summary.get('p99_ms', 0):8.2f} ms  "
+                f"errors {summary['errors']}"
+            )
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{results['meta']['commit'] or 'nogit'}.json"
+    Path(output).write_text(json.dumps(results, indent=2) + "\n")
+    print(f"saved {output}")
+
+
+def compare(old_path: str, new_path: str) -> None:
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}")
+    for name, after in new["scenarios"].items():
+        before = old["scenarios"].get(name)
+        if before is None:
+            print(f"{name:15} (new scenario)")
+            continue
+        cells = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            if key in before and key in after and before[key]:
+                change = (after[key] - before[key]) / before[key] * 100
+                cells.append(f"{key} {before[key]} -> {after[key]} ({change:+.1f}%)")
+        print(f"{name:15} " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run")
+    target = run_parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8000")
+    target.add_argument("--in-process", action="store_true")
+    run_parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    run_parser.add_argument("--duration", type=float, default=30.0, help="seconds per scenario")
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--workers", type=int, default=20, help="bench workers to log in")
+    run_parser.add_argument("--output")
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.old, args.new)
+    else:
+        asyncio.run(run(args))
@@ -0,0 +1,152 @@
+"""Seed a local Postgres with a benchmark dataset.
+
+Usage: python -m benchmarks.seed [--scale 10k|100k|1m|10m|N] [--workers 20] [--reset]
+
+Rows are generated server-side with generate_series, one transaction per batch, so even 10M
+tickets never pass through Python. Logins are ``bench-admin`` and ``bench-worker-<n>`` with
+password ``bench-password``. Ticket ``g`` always gets the same content, so re-running at a larger
+scale only adds the missing tickets (repeats find their content key already claimed). Counter
+and change-feed triggers are skipped during the load; ticket_counters is rebuilt at the end.
+Uses DATABASE_URL, like the API.
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import text
+
+from app.counters import rebuild
+from app.db import AsyncSessionLocal, engine
+from app.security import pwd_context
+
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+PASSWORD = "bench-password"
+TICKETS_PER_CLIENT = 4
+# created_at spreads the dataset over the last year
+SPAN_SECONDS = 365 * 24 * 3600
+
+USERS_SQL = """
+INSERT INTO users (username, password_hash, role, created_at)
+SELECT 'bench-admin', :hash, 'admin'::userrole, now()
+UNION ALL
+SELECT 'bench-worker-' || g, :hash, 'worker'::userrole, now() FROM generate_series(1, :workers) g
+ON CONFLICT (username) DO NOTHING
+"""
+
+CLIENTS_SQL = """
+INSERT INTO clients (name, email, phone, created_at)
+SELECT 'Bench Client ' || g, 'bench-client-' || g || '@example.com',
+       '+1555' || lpad(g::text, 7, '0'),
+       now() - make_interval(secs => CAST(:span AS double precision) * (:total - g) / :total)
+FROM generate_series(CAST(:lo AS integer), CAST(:hi AS integer)) g
+ON CONFLICT (email_key) DO NOTHING
+"""
+
+# status by g % 10: 0-3 new (0-1 unassigned), 4-6 in_progress, 7-9 done
+TICKETS_SQL = """
+WITH rows AS (
+    SELECT s.*, c.id AS client_id,
+           -- app.models.ticket_content_hash; generated text has no runs of whitespace to collapse
+           encode(sha256(convert_to(
+               lower(s.title) || chr(31) || lower(s.description) || chr(31) || c.email_key, 'UTF8'
+           )), 'hex') AS content_hash
+    FROM (
+        SELECT g,
+               (ARRAY['Broken screen', 'Battery drains fast', 'No power', 'Keyboard fault',
+                      'Overheating', 'Wi-Fi drops', 'Cracked case', 'Slow boot'])[1 + g % 8]
+                   || ' #' || g AS title,
+               'Customer reports a problem with their '
+                   || (ARRAY['laptop', 'phone', 'tablet', 'printer', 'monitor', 'router'])[1 + g % 6]
+                   || ', ' || (ARRAY['urgent', 'intermittent', 'after update', 'since a drop',
+                                     'on battery only'])[1 + g % 5]
+                   || '. Reference ' || md5(g::text) AS description,
+               (ARRAY['new', 'new', 'new', 'new', 'in_progress', 'in_progress', 'in_progress',
+                      'done', 'done', 'done'])[1 + g % 10]::ticketstatus AS status,
+               CASE WHEN g % 10 >= 2 THEN w.ids[1 + g % array_length(w.ids, 1)] END AS worker_id,
+               now() - make_interval(secs => CAST(:span AS double precision) * (:total - g) / :total)
+                   AS created_at,
+               g % 3 = 0 AS viewed
+        FROM generate_series(CAST(:lo AS integer), CAST(:hi AS integer)) g,
+             (SELECT array_agg(id ORDER BY id) AS ids FROM users WHERE username LIKE 'bench-worker-%') w
+    ) s
+    JOIN clients c ON c.email_key = 'bench-client-' || (1 + (s.g - 1) / :per_client) || '@example.com'
+),
+-- tickets already seeded keep their content key, so repeats claim nothing
+claimed AS (
+    INSERT INTO ticket_content_keys (content_hash, ticket_id, created_at)
+    SELECT content_hash, nextval('tickets_id_seq'), created_at FROM rows
+    ON CONFLICT (content_hash) DO NOTHING
+    RETURNING content_hash, ticket_id
+)
+INSERT INTO tickets (
+    id, title, description, status, client_id, worker_id, created_at, updated_at, viewed,
+    assigned_at, in_progress_at, done_at, requester_ip, requester_ua, content_hash
+)
+SELECT k.ticket_id, r.title, r.description, r.status, r.client_id, r.worker_id, r.created_at,
+       r.created_at, r.viewed,
+       CASE WHEN r.worker_id IS NOT NULL THEN r.created_at + interval '1 hour' END,
+       CASE WHEN r.status <> 'new' THEN r.created_at + interval '2 hours' END,
+       CASE WHEN r.status = 'done' THEN r.created_at + interval '1 day' END,
+       '10.' || (r.g / 65536 % 256) || '.' || (r.g / 256 % 256) || '.' || (r.g % 256),
+       'bench-seed',
+       r.content_hash
+FROM rows r JOIN claimed k USING (content_hash)
+"""
+
+RESET_SQL = (
+    "TRUNCATE tickets, ticket_content_keys, clients, ticket_counters, ticket_events "
+    "RESTART IDENTITY CASCADE",
+    "DELETE FROM users WHERE username = 'bench-admin' OR username LIKE 'bench-worker-%'",
+)
+
+
+async def _batches(sql: str, total: int, batch: int, label: str, **params) -> int:
+    inserted = 0
+    for lo in range(1, total + 1, batch):
+        hi = min(lo + batch - 1, total)
+        async with engine.begin() as conn:
+            # bulk load: ticket_counters is rebuilt afterwards and nobody needs the change feed
+            await conn.execute(text("SET LOCAL app.skip_ticket_counters = on"))
+            await conn.execute(text("SET LOCAL app.skip_ticket_events = on"))
+            result = await conn.execute(text(sql), {"lo": lo, "hi": hi, "total": total, **params})
+            inserted += result.rowcount
+        print(f"{label}: {hi}/{total}", end="\r", flush=True)
+    print(f"{label}: {total} ({inserted} new)")
+    return inserted
+
+
+async def seed(tickets: int, workers: int, batch: int, reset: bool) -> None:
+    start = time.perf_counter()
+    if reset:
+        async with engine.begin() as conn:
+            for statement in RESET_SQL:
+                await conn.execute(text(statement))
+    clients = -(-tickets // TICKETS_PER_CLIENT)
+    async with engine.begin() as conn:
+        password_hash = pwd_context.hash(PASSWORD)
+        await conn.execute(text(USERS_SQL), {"hash": password_hash, "workers": workers})
+    await _batches(CLIENTS_SQL, clients, batch, "clients", span=SPAN_SECONDS)
+    await _batches(
+        TICKETS_SQL, tickets, batch, "tickets", span=SPAN_SECONDS, per_client=TICKETS_PER_CLIENT
+    )
+    async with AsyncSessionLocal() as db:
+        await rebuild(db)
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE users, clients, tickets, ticket_content_keys, ticket_counters"))
+    print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+
+def parse_count(value: str) -> int:
+    return SCALES.get(value.lower()) or int(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=parse_count, default="10k", help="10k, 100k, 1m, 10m or N")
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=100_000, help="rows per transaction")
+    parser.add_argument("--reset", action="store_true", help="truncate tickets and clients first")
+    args = parser.parse_args()
+    asyncio.run(seed(args.scale, max(args.workers, 1), args.batch, args.reset))
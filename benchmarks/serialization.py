@@ -0,0 +1,133 @@
+"""Microbenchmark: ticket list serialization, pydantic response model vs the orjson fast path.
+
+Usage: python -m benchmarks.serialization [--rows 100] [--rounds 200]
+
+The pydantic path is the old ``GET /tickets/`` path: build ``TicketOut`` objects from ORM rows,
+validate and serialize them through the route's response field, then render ``JSONResponse``.
+The fast path is the current one: column rows (as the projected query returns them) are
+turned into dicts with ``TicketProjection`` and encoded with orjson. The two outputs are
+compared before timing.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from app.main import app
+from app.models import Client, Ticket, TicketStatus, User, UserRole
+from app.schemas import TicketsListOut, ticket_out
+from app.serializers import TicketProjection, json_response
+
+
+def make_rows(n: int) -> list[Ticket]:
+    now = datetime.now(timezone.utc)
+    worker = User(id=2, username="worker", password_hash="x", role=UserRole.worker, created_at=now)
+    rows = []
+    for i in range(n):
+        client = Client(
+            id=i, name=f"Client {i}", email=f"client{i}@example.com", phone="+1234567890", created_at=now
+        )
+        ticket = Ticket(
+            id=i,
+            title=f"Broken laptop screen #{i}",
+            description="Screen flickers and has dead pixels. " * 4,
+            status=TicketStatus.in_progress if i % 2 else TicketStatus.new,
+            viewed=bool(i % 3),
+            client=client,
+            worker=worker if i % 2 else None,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+            assigned_at=now if i % 2 else None,
+            in_progress_at=now if i % 2 else None,
+            done_at=None,
+            requester_ip="127.0.0.1",
+            requester_ua="Mozilla/5.0",
+        )
+        rows.append(ticket)
+    return rows
+
+
+def as_column_rows(tickets: list[Ticket], projection: TicketProjection) -> list[dict]:
+    """The mappings the projected list query yields for these tickets."""
+    rows = []
+    for t in tickets:
+        row = {f: getattr(t, f) for f in ("id", "created_at", *projection.ticket)}
+        row.update({f"client_{f}": getattr(t.client, f) for f in projection.client})
+        row.update({f"worker_{f}": getattr(t.worker, f) if t.worker else None for f in projection.worker})
+        row["worker_id"] = t.worker.id if t.worker else None
+        rows.append(row)
+    return rows
+
+
+def list_route() -> APIRoute:
+    return next(r for r in app.routes if isinstance(r, APIRoute) and r.path == "/tickets/")
+
+
+async def pydantic_path(tickets: list[Ticket], route: APIRoute) -> bytes:
+    out = TicketsListOut(
+        items=[ticket_out(t, t.client, t.worker) for t in tickets],
+        total=len(tickets),
+        page=1,
+        size=len(tickets),
+    )
+    content = await serialize_response(field=route.response_field, response_content=out)
+    return JSONResponse(content).body
+
+
+def fast_path(projection: TicketProjection):
+    async def run(rows: list[dict], route: APIRoute) -> bytes:
+        content = {
+            "items": [projection.item(row) for row in rows],
+            "total": len(rows),
+            "page": 1,
+            "size": len(rows),
+            "next_cursor": None,
+        }
+        return json_response(content).body
+
+    return run
+
+
+async def timed(fn, rows, route, rounds: int) -> list[float]:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn(rows, route)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(rows_count: int, rounds: int) -> None:
+    tickets = make_rows(rows_count)
+    route = list_route()
+    full = TicketProjection.parse(None, None)
+    sparse = TicketProjection.parse("id,title,status,worker.username", None)
+    full_rows = as_column_rows(tickets, full)
+    if json.loads(await pydantic_path(tickets, route)) != json.loads(await fast_path(full)(full_rows, route)):
+        raise SystemExit("fast path output differs from the response model")
+    cases = (
+        ("pydantic", pydantic_path, tickets),
+        ("orjson", fast_path(full), full_rows),
+        ("orjson, fields=id,title,status,worker.username", fast_path(sparse), as_column_rows(tickets, sparse)),
+    )
+    for name, fn, rows in cases:
+        await timed(fn, rows, route, 10)
+        samples = await timed(fn, rows, route, rounds)
+        print(
+            f"{name}: median {statistics.median(samples) * 1000:.3f} ms, "
+            f"p95 {statistics.quantiles(samples, n=20)[-1] * 1000:.3f} ms per {rows_count}-row page"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.rounds))
@@ -0,0 +1,36 @@
+"""Principal cache: user changes take effect on the next request, not after the cache TTL."""
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_role_change_is_seen_at_once(client, auth, new_worker):
+    worker_id, username, headers = await new_worker()
+    assert (await client.get("/auth/me", headers=headers)).json()["role"] == "worker"
+    response = await client.put(
+        f"/users/{worker_id}",
+        json={"username": username, "password": "secret123", "role": "admin"},
+        headers=auth,
+    )
+    assert response.status_code == 200
+    assert (await client.get("/auth/me", headers=headers)).json()["role"] == "admin"
+
+
+async def test_renamed_user_old_token_stops_working(client, auth, new_worker):
+    worker_id, username, headers = await new_worker()
+    assert (await client.get("/auth/me", headers=headers)).status_code == 200
+    response = await client.put(
+        f"/users/{worker_id}",
+        json={"username": f"{username}x", "password": "secret123", "role": "worker"},
+        headers=auth,
+    )
+    assert response.status_code == 200
+    assert (await client.get("/auth/me", headers=headers)).status_code == 401
+
+
+async def test_deleted_user_token_stops_working(client, auth, new_worker):
+    worker_id, _, headers = await new_worker()
+    assert (await client.get("/tickets/", headers=headers)).status_code == 200
+    assert (await client.delete(f"/users/{worker_id}", headers=auth)).status_code == 204
+    assert (await client.get("/tickets/", headers=headers)).status_code == 401
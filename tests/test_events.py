@@ -0,0 +1,15 @@
+"""GET /tickets/events: Last-Event-ID validation (before the stream starts)."""
+
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize(
+    "last_event_id",
+    ["abc", "-1", "5:-1", "99999999999999999999:1", "5:99999999999999999999", "5:x"],
+)
+async def test_invalid_last_event_id(client, auth, last_event_id):
+    response = await client.get("/tickets/events", headers={**auth, "Last-Event-ID": last_event_id})
+    assert response.status_code == 400
@@ -0,0 +1,50 @@
+"""POST /public/tickets: content-hash duplicate detection."""
+
+import asyncio
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def _payload(title: str, description: str, email: str) -> dict:
+    return {
+        "title": title,
+        "description": description,
+        "client": {"name": "Someone", "email": email},
+    }
+
+
+async def test_duplicate_ignores_case_and_whitespace(client):
+    tag = uuid.uuid4().hex[:12]
+    original = _payload(f"Broken screen {tag}", "Cracked  in the corner", f"{tag}@example.com")
+    response = await client.post("/public/tickets", json=original)
+    assert response.status_code == 201
+    for variant in (
+        original,
+        _payload(f"  BROKEN screen {tag}", "cracked in\tthe\ncorner ", f"{tag}@EXAMPLE.com"),
+        _payload(f"Broken screen {tag}", "Cracked in the corner", f"{tag}@example.com"),
+    ):
+        response = await client.post("/public/tickets", json=variant)
+        assert response.status_code == 409, variant
+
+
+async def test_different_content_is_not_a_duplicate(client):
+    tag = uuid.uuid4().hex[:12]
+    email = f"{tag}@example.com"
+    assert (
+        await client.post("/public/tickets", json=_payload(f"A {tag}", "one", email))
+    ).status_code == 201
+    assert (
+        await client.post("/public/tickets", json=_payload(f"A {tag}", "two", email))
+    ).status_code == 201
+
+
+async def test_concurrent_identical_submissions_create_one_ticket(client):
+    tag = uuid.uuid4().hex[:12]
+    payload = _payload(f"Race {tag}", "same", f"{tag}@example.com")
+    responses = await asyncio.gather(
+        *(client.post("/public/tickets", json=payload) for _ in range(5))
+    )
+    assert sorted(r.status_code for r in responses) == [201, 409, 409, 409, 409]
@@ -0,0 +1,78 @@
+"""Size limits of POST /public/tickets/batch."""
+
+import json
+import uuid
+
+import pytest
+
+from app.core.config import settings
+
+
+pytestmark = pytest.mark.anyio
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "public_batch_max_records", 5)
+    monkeypatch.setattr(settings, "public_batch_max_bytes", 4000)
+    monkeypatch.setattr(settings, "public_batch_max_line_bytes", 600)
+    monkeypatch.setattr(settings, "public_batch_chunk_size", 2)
+
+
+def _records(count: int) -> list[dict]:
+    tag = uuid.uuid4().hex[:12]
+    return [
+        {"title": f"Batch {tag} {i}", "description": "d", "client": {"name": "n", "email": f"{tag}{i}@x.com"}}
+        for i in range(count)
+    ]
+
+
+async def _chunks(data: bytes, size: int = 50):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _ndjson(records: list) -> bytes:
+    return "\n".join(json.dumps(record) for record in records).encode()
+
+
+async def test_json_array_over_limits_inserts_nothing(client, auth, limits):
+    records = _records(6)
+    response = await client.post("/public/tickets/batch", json=records)
+    assert response.status_code == 413
+    response = await client.get("/tickets/", params={"search": records[0]["title"]}, headers=auth)
+    assert response.json()["items"] == []
+
+    response = await client.post("/public/tickets/batch", json=_records(1) * 40)
+    assert response.status_code == 413
+
+
+async def test_ndjson_record_limit_truncates(client, limits):
+    response = await client.post("/public/tickets/batch", content=_chunks(_ndjson(_records(7))), headers=NDJSON)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 5
+    assert [r["index"] for r in body["results"]] == [0, 1, 2, 3, 4]
+    assert body["truncated"] == "At most 5 records per batch"
+
+
+async def test_ndjson_long_line_truncates(client, limits):
+    data = _ndjson(_records(2)) + b"\n" + b"x" * 700
+    response = await client.post("/public/tickets/batch", content=_chunks(data), headers=NDJSON)
+    body = response.json()
+    assert body["created"] == 2
+    assert "600 bytes" in body["truncated"]
+
+
+async def test_ndjson_cut_before_first_record(client, limits):
+    response = await client.post("/public/tickets/batch", content=_chunks(b"x" * 700), headers=NDJSON)
+    assert response.status_code == 413
+
+
+async def test_budget_grows_per_chunk(client, query_log, limits):
+    with query_log.expect(max_statements=9):
+        response = await client.post("/public/tickets/batch", json=_records(5))
+    assert response.json()["created"] == 5
+    assert response.json()["truncated"] is None
@@ -0,0 +1,163 @@
+"""SQL statement counts per endpoint: each stays within its route's query_budget(n)."""
+
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def _worker_id(client, worker_auth) -> int:
+    return (await client.get("/auth/me", headers=worker_auth)).json()["id"]
+
+
+async def test_login_and_me(client, query_log):
+    with query_log.expect(max_statements=1):
+        response = await client.post(
+            "/auth/login", json={"username": "admin", "password": "admin123"}
+        )
+    token = response.json()["access_token"]
+    with query_log.expect(max_statements=1):
+        response = await client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+async def test_public_create(query_log, new_ticket):
+    with query_log.expect(max_statements=1):
+        await new_ticket()
+
+
+async def test_public_create_duplicate(client, query_log, new_ticket):
+    ticket = await new_ticket()
+    payload = {
+        "title": ticket["title"],
+        "description": ticket["description"],
+        "client": {"name": "Someone", "email": ticket["client"]["email"]},
+    }
+    with query_log.expect(max_statements=1):
+        response = await client.post("/public/tickets", json=payload)
+    assert response.status_code == 409
+
+
+async def test_public_batch(client, query_log):
+    tag = uuid.uuid4().hex[:12]
+    records = [
+        {
+            "title": f"Batch {tag} {i}",
+            "description": "d",
+            "client": {"name": "n", "email": f"{tag}{i % 2}@x.com"},
+        }
+        for i in range(5)
+    ]
+    with query_log.expect(max_statements=3):
+        response = await client.post("/public/tickets/batch", json=records)
+    assert response.json()["created"] == 5
+    assert not query_log.repeated()
+
+
+async def test_list_tickets(client, auth, query_log, new_ticket):
+    for _ in range(3):
+        await new_ticket()
+    with query_log.expect(max_statements=4):
+        response = await client.get("/tickets/", params={"size": 2, "cursor": ""}, headers=auth)
+    assert response.status_code == 200
+    cursor = response.json()["next_cursor"]
+    assert cursor
+    with query_log.expect(max_statements=4):
+        response = await client.get("/tickets/", params={"size": 2, "cursor": cursor}, headers=auth)
+    assert response.status_code == 200
+    with query_log.expect(max_statements=4):
+        response = await client.get(
+            "/tickets/", params={"search": "printer", "size": 5}, headers=auth
+        )
+    assert response.status_code == 200
+    assert not query_log.repeated()
+
+
+async def test_list_tickets_worker(client, worker_auth, query_log):
+    with query_log.expect(max_statements=4):
+        response = await client.get("/tickets/", params={"size": 5}, headers=worker_auth)
+    assert response.status_code == 200
+
+
+async def test_stats(client, auth, worker_auth, query_log):
+    worker_id = await _worker_id(client, worker_auth)
+    with query_log.expect(max_statements=3):
+        response = await client.get("/tickets/stats", params={"worker_id": worker_id}, headers=auth)
+    assert response.status_code == 200
+    with query_log.expect(max_statements=3):
+        response = await client.get(
+            "/tickets/stats",
+            params={"worker_id": worker_id},
+            headers={**auth, "If-None-Match": response.headers["ETag"]},
+        )
+    assert response.status_code == 304
+    with query_log.expect(max_statements=3):
+        response = await client.get("/tickets/stats/workload", headers=auth)
+    assert response.status_code == 200
+
+
+async def test_assign_and_status(client, auth, worker_auth, query_log, new_ticket):
+    ticket = await new_ticket()
+    worker_id = await _worker_id(client, worker_auth)
+    with query_log.expect(max_statements=3):
+        response = await client.post(
+            f"/tickets/{ticket['id']}/assign", json=worker_id, headers=auth
+        )
+    assert response.status_code == 200
+    with query_log.expect(max_statements=3):
+        response = await client.post(
+            f"/tickets/{ticket['id']}/status", json="in_progress", headers=worker_auth
+        )
+    assert response.json()["status"] == "in_progress"
+    with query_log.expect(max_statements=3):
+        response = await client.post(
+            f"/tickets/{ticket['id']}/viewed", json={"viewed": True}, headers=worker_auth
+        )
+    assert response.status_code == 200
+    # a guarded update that matches nothing costs one extra lookup
+    with query_log.expect(max_statements=3):
+        response = await client.post("/tickets/2147483647/status", json="done", headers=auth)
+    assert response.status_code == 404
+
+
+async def test_bulk_updates(client, auth, worker_auth, query_log, new_ticket):
+    ids = [(await new_ticket())["id"] for _ in range(3)]
+    worker_id = await _worker_id(client, worker_auth)
+    with query_log.expect(max_statements=4):
+        response = await client.post(
+            "/tickets/bulk/assign", json={"ids": ids, "worker_id": worker_id}, headers=auth
+        )
+    assert response.json()["updated"] == 3
+    with query_log.expect(max_statements=3):
+        response = await client.post(
+            "/tickets/bulk/status", json={"ids": ids, "new_status": "done"}, headers=worker_auth
+        )
+    assert response.json()["updated"] == 3
+    with query_log.expect(max_statements=3):
+        response = await client.post(
+            "/tickets/bulk/viewed", json={"ids": ids, "viewed": True}, headers=auth
+        )
+    assert response.json()["updated"] == 3
+    assert not query_log.repeated()
+
+
+async def test_users(client, auth, query_log):
+    with query_log.expect(max_statements=3):
+        response = await client.get("/users/", headers=auth)
+    assert response.status_code == 200
+    with query_log.expect(max_statements=4):
+        response = await client.post(
+            "/users/",
+            json={
+                "username": f"w{uuid.uuid4().hex[:10]}",
+                "password": "secret123",
+                "role": "worker",
+            },
+            headers=auth,
+        )
+    assert response.status_code == 201
+    user_id = response.json()["id"]
+    with query_log.expect(max_statements=4):
+        response = await client.delete(f"/users/{user_id}", headers=auth)
+    assert response.status_code == 204
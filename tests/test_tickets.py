@@ -0,0 +1,129 @@
+"""Ticket routes: cursor paging, guarded updates under concurrency and the counter rollup."""
+
+import asyncio
+import base64
+import json
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.counters import count_tickets, verify
+from app.db import AsyncSessionLocal
+from app.models import Ticket
+
+pytestmark = pytest.mark.anyio
+
+
+async def _assigned_tickets(client, auth, new_ticket, worker_id: int, count: int) -> list[int]:
+    ids = [(await new_ticket())["id"] for _ in range(count)]
+    response = await client.post(
+        "/tickets/bulk/assign", json={"ids": ids, "worker_id": worker_id}, headers=auth
+    )
+    assert response.json()["updated"] == count
+    return ids
+
+
+async def test_cursor_pages_cover_every_ticket_once(client, auth, new_ticket, new_worker):
+    worker_id, _, _ = await new_worker()
+    ids = await _assigned_tickets(client, auth, new_ticket, worker_id, 5)
+    seen, cursor = [], ""
+    while cursor is not None:
+        response = await client.get(
+            "/tickets/", params={"worker_id": worker_id, "size": 2, "cursor": cursor}, headers=auth
+        )
+        assert response.status_code == 200
+        body = response.json()
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+    # newest first; ids grow with created_at here
+    assert seen == sorted(ids, reverse=True)
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        _cursor(["2024-01-01T00:00:00", 5]),
+        _cursor(["2024-01-01T00:00:00+00:00", 2**40]),
+        _cursor(["yesterday", 5]),
+        _cursor({"created_at": "2024-01-01T00:00:00+00:00"}),
+    ],
+)
+async def test_malformed_cursor(client, auth, cursor):
+    response = await client.get("/tickets/", params={"cursor": cursor}, headers=auth)
+    assert response.status_code == 400
+
+
+async def test_status_change_racing_a_reassignment_is_refused(client, auth, new_ticket, new_worker):
+    first_id, _, first_auth = await new_worker()
+    second_id, _, _ = await new_worker()
+    (ticket_id,) = await _assigned_tickets(client, auth, new_ticket, first_id, 1)
+    async with AsyncSessionLocal() as other:
+        # reassign without committing: the worker's guarded UPDATE waits on the row lock
+        await other.execute(
+            update(Ticket).where(Ticket.id == ticket_id).values(worker_id=second_id)
+        )
+        request = asyncio.create_task(
+            client.post(f"/tickets/{ticket_id}/status", json="done", headers=first_auth)
+        )
+        await asyncio.sleep(0.3)
+        assert not request.done()
+        await other.commit()
+    response = await request
+    # the guard is re-checked against the committed row, so the stale owner's change is refused
+    assert response.status_code == 403
+    async with AsyncSessionLocal() as db:
+        row = (
+            await db.execute(select(Ticket.worker_id, Ticket.status).where(Ticket.id == ticket_id))
+        ).one()
+    assert row.worker_id == second_id
+    assert row.status.value == "new"
+
+
+async def test_bulk_status_racing_a_reassignment_reports_forbidden(
+    client, auth, new_ticket, new_worker
+):
+    first_id, _, first_auth = await new_worker()
+    second_id, _, _ = await new_worker()
+    kept, moved = await _assigned_tickets(client, auth, new_ticket, first_id, 2)
+    async with AsyncSessionLocal() as other:
+        await other.execute(update(Ticket).where(Ticket.id == moved).values(worker_id=second_id))
+        request = asyncio.create_task(
+            client.post(
+                "/tickets/bulk/status",
+                json={"ids": [moved, kept], "new_status": "done"},
+                headers=first_auth,
+            )
+        )
+        await asyncio.sleep(0.3)
+        assert not request.done()
+        await other.commit()
+    results = {r["id"]: r["result"] for r in (await request).json()["results"]}
+    assert results == {kept: "updated", moved: "forbidden"}
+
+
+async def test_counter_rollup_matches_real_counts(
+    client, auth, worker_auth, new_ticket, new_worker
+):
+    worker_id, _, worker_headers = await new_worker()
+    ids = await _assigned_tickets(client, auth, new_ticket, worker_id, 3)
+    await client.post(f"/tickets/{ids[0]}/status", json="in_progress", headers=worker_headers)
+    await client.post(
+        "/tickets/bulk/status", json={"ids": ids[1:], "new_status": "done"}, headers=worker_headers
+    )
+    await client.delete(f"/users/{worker_id}", headers=auth)
+    async with AsyncSessionLocal() as db:
+        assert await verify(db) == []
+        actual = (await db.execute(select(func.count()).select_from(Ticket))).scalar()
+        assert await count_tickets(db) == actual
+    response = await client.get(
+        "/tickets/stats/workload", params={"worker_id": worker_id}, headers=auth
+    )
+    (workload,) = [w for w in response.json()["workers"] if w["worker_id"] == worker_id]
+    assert (workload["assigned"], workload["in_progress"], workload["done"]) == (0, 1, 2)
+    response = await client.get("/tickets/", params={"worker_id": worker_id}, headers=auth)
+    assert response.json()["total"] == 3
@@ -19,6 +19,24 @@ def auth_headers():
     return {"Authorization": f"Bearer {token}"} if token else {}
 
 
+def cached_get(path: str, params=None):
+    """GET with If-None-Match; a 304 reuses the body kept in the session from the last 200."""
+    cache = st.session_state.setdefault("http_cache", {})
+    key = (path, repr(sorted((params or {}).items())), st.session_state.get("token"))
+    headers = auth_headers()
+    if key in cache:
+        headers["If-None-Match"] = cache[key][0]
+    with httpx.Client(timeout=10) as client:
+        resp = client.get(f"{API_URL}{path}", params=params, headers=headers)
+        if resp.status_code == 304 and key in cache:
+            return cache[key][1]
+        resp.raise_for_status()
+        body = resp.json()
+        if resp.headers.get("etag"):
+            cache[key] = (resp.headers["etag"], body)
+        return body
+
+
 def me():
     with httpx.Client(timeout=10) as client:
         resp = client.get(f"{API_URL}/auth/me", headers=auth_headers())
@@ -34,10 +52,7 @@ def list_tickets(page=1, size=10, search=None, status=None, worker_id=None):
         params["status"] = status
     if worker_id:
         params["worker_id"] = worker_id
-    with httpx.Client(timeout=10) as client:
-        resp = client.get(f"{API_URL}/tickets/", params=params, headers=auth_headers())
-        resp.raise_for_status()
-        return resp.json()
+    return cached_get("/tickets/", params)
 
 
 def update_ticket_status(ticket_id: int, new_status: str):
@@ -74,17 +89,15 @@ def assign_ticket(ticket_id: int, worker_id: int):
 
 
 def list_users():
-    with httpx.Client(timeout=10) as client:
-        resp = client.get(f"{API_URL}/users/", headers=auth_headers())
-        resp.raise_for_status()
-        return resp.json()
+    return cached_get("/users/")
 
 
 def tickets_stats(worker_id: int):
-    with httpx.Client(timeout=10) as client:
-        resp = client.get(f"{API_URL}/tickets/stats", params={"worker_id": worker_id}, headers=auth_headers())
-        resp.raise_for_status()
-        return resp.json()
+    return cached_get("/tickets/stats", {"worker_id": worker_id})
+
+
+def tickets_workload(worker_ids=None):
+    return cached_get("/tickets/stats/workload", {"worker_id": worker_ids} if worker_ids else None)
 
 
 def create_user(username: str, password: str, role: str):
@@ -466,23 +479,22 @@ def main():
                     # Token in URL for opening new tab
                     base_url = "?"
 
+                    # One grouped stats call for all workers
+                    try:
+                        workload = {
+                            s["worker_id"]: s
+                            for s in tickets_workload([w["id"] for w in workers]).get("workers", [])
+                        }
+                    except Exception as e:
+                        st.error(f"Cannot load stats: {e}")
+                        workload = {}
+
                     for w in workers:
                         with st.expander(f"{w['username']}"):
                             cols = st.columns([2, 2, 2, 2])
-                            # Prefer precise stats endpoint; fallback to list counts
-                            try:
-                                s = tickets_stats(w["id"])  # exact stats per worker
-                                assigned = s.get("assigned", 0)
-                                in_prog = s.get("in_progress", 0)
-                            except Exception:
-                                try:
-                                    assigned = list_tickets(page=1, size=1, worker_id=w["id"], status="new").get("total", 0)
-                                except Exception:
-                                    assigned = 0
-                                try:
-                                    in_prog = list_tickets(page=1, size=1, worker_id=w["id"], status="in_progress").get("total", 0)
-                                except Exception:
-                                    in_prog = 0
+                            s = workload.get(w["id"], {})
+                            assigned = s.get("assigned", 0)
+                            in_prog = s.get("in_progress", 0)
                             with cols[0]:
                                 st.metric("Assigned", assigned)
                             with cols[1]: